@@ -2,24 +2,55 @@ from faker import Faker
 import pandas as pd
 import numpy as np
 import random
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 import phonenumbers
-from phonenumbers import geocoder, carrier
-from phonenumbers.phonenumberutil import region_code_for_country_code
-import csv
+from schema import COLUMN_DTYPES
 
 
 # Initialize Faker
 fake = Faker()
 
+# Categorical values shared by create_record() and generate_records()
+PRODUCT_TYPES = [
+    'Prototyping Tool', 'Design Software', 'Project Management Suite', 'Collaboration Platform',
+    'Data Analytics Tool', 'Customer Relationship Management (CRM) Software', 'Marketing Automation Tool',
+    'E-commerce Platform', 'Content Management System (CMS)', 'Accounting Software',
+    'Human Resources Management System (HRMS)', 'Inventory Management System', 'Email Marketing Software',
+    'Website Builder', 'Video Conferencing Tool', 'Task Management App', 'Social Media Management Tool',
+    'Cloud Storage Solution', 'Cybersecurity Software', 'Artificial Intelligence (AI) Analytics Tool',
+    'Chatbot and Conversational AI Platforms', 'Video Editing Software', 'Document Management System',
+    'Learning Management System (LMS)', 'Point of Sale (POS) Systems', 'Supply Chain Management Software',
+    'Business Intelligence (BI) Tools', 'Graphic Design Software', 'Mobile App Development Platforms',
+    'Event Management Software', 'Performance Management Software']
+PROMOTIONAL_EVENTS = [
+    'AI Technology Expos', 'Workshops on Prototyping Solutions', 'Webinars on AI Integration in Business',
+    'Panel Discussions with AI Experts', 'AI-Driven Marketing Strategy Sessions']
+STATUS_MEANING = {
+    'In Progress': 'Work on the product is underway.',
+    'Completed': 'The product has been successfully delivered.',
+    'On Hold': 'The product delivery has been temporarily paused.',
+    'Cancelled': 'The order was cancelled before completion.'
+}
+PRODUCT_STATUSES = list(STATUS_MEANING)
+POSITIVE_COMMENT_WORDS = ["Excellent", "Great", "Loved", "Fantastic", "Highly recommend", "Will buy again"]
+CANCELLED_COMMENT_WORDS = ["Cancellation due to delays", "Service was not as described"]
+CANCELLATION_FEE = 20.0
+DATE_START = date(2022, 1, 1)
+DATE_END = date(2025, 12, 31)
+
 # Function to get a properly formatted international phone number
-def generate_phone_number(country):
+def generate_phone_number(country, faker=None):
+    if faker is None:
+        faker = fake
     try:
         # Generate a fake phone number
-        number = fake.phone_number()
+        number = faker.phone_number()
         
         # Try to get the country code for the given country
-        country_code = phonenumbers.country_code_for_region(fake.country_code(representation="alpha-2"))
+        country_code = phonenumbers.country_code_for_region(faker.country_code(representation="alpha-2"))
 
         # Parse and reformat the number with the country code
         parsed_number = phonenumbers.parse(number, None)
@@ -33,7 +64,7 @@ def generate_phone_number(country):
             return f"+{country_code}{clean_number[-10:]}"  # Use last 10 digits assuming it's a mobile number
     except:
         # Fallback if formatting fails
-        return f"+{random.randint(1, 199)}{random.randint(1000000000, 9999999999)}"
+        return f"+{faker.random.randint(1, 199)}{faker.random.randint(1000000000, 9999999999)}"
 
 # Function to create a single record
 def create_record():
@@ -48,40 +79,22 @@ def create_record():
     customer_type = random.choice(['Subscriber', 'Non-Subscriber'])
     Benefits_of_Membership_Type = random.choice(['Basic support', 'Exclusive offers'])
     Subscription_Duration = random.choice(['Monthly', 'Yearly'])
-    Subscription_Date = fake.date_between(start_date=date(2022, 1, 1), end_date=date(2025, 12, 31))
+    Subscription_Date = fake.date_between(start_date=DATE_START, end_date=DATE_END)
     subscription_type = random.choice(['Premium', 'Standard', 'Free'])
     price = 50.0 if subscription_type == 'Premium' else 25.0 if subscription_type == 'Standard' else 0.0
     Product_ID = random.randint(100, 200)
-    product_type = random.choice([
-        'Prototyping Tool', 'Design Software', 'Project Management Suite', 'Collaboration Platform',
-        'Data Analytics Tool', 'Customer Relationship Management (CRM) Software', 'Marketing Automation Tool',
-        'E-commerce Platform', 'Content Management System (CMS)', 'Accounting Software',
-        'Human Resources Management System (HRMS)', 'Inventory Management System', 'Email Marketing Software',
-        'Website Builder', 'Video Conferencing Tool', 'Task Management App', 'Social Media Management Tool',
-        'Cloud Storage Solution', 'Cybersecurity Software', 'Artificial Intelligence (AI) Analytics Tool',
-        'Chatbot and Conversational AI Platforms', 'Video Editing Software', 'Document Management System',
-        'Learning Management System (LMS)', 'Point of Sale (POS) Systems', 'Supply Chain Management Software',
-        'Business Intelligence (BI) Tools', 'Graphic Design Software', 'Mobile App Development Platforms',
-        'Event Management Software', 'Performance Management Software'])
+    product_type = random.choice(PRODUCT_TYPES)
     Inquiry_Type = random.choice(['Product question', 'Promotional event', 'Issue with product'])
     cost_of_service = round(np.random.uniform(20, 100), 2)
-    sales_date = fake.date_between(start_date=date(2022, 1, 1), end_date=date(2025, 12, 31))
+    sales_date = fake.date_between(start_date=DATE_START, end_date=DATE_END)
     sales_time = fake.time()
     demo_scheduled = random.choice(['Yes', 'No'])
     Promotional_Event_Participation = random.choice(['Yes', 'No'])
-    Type_of_Promotional_Event = random.choice([
-        'AI Technology Expos', 'Workshops on Prototyping Solutions', 'Webinars on AI Integration in Business',
-        'Panel Discussions with AI Experts', 'AI-Driven Marketing Strategy Sessions'])
+    Type_of_Promotional_Event = random.choice(PROMOTIONAL_EVENTS)
     price_of_service = round(np.random.uniform(150, 300), 2)
     response_time = random.randint(1, 10)
     product_status = random.choice(['In Progress', 'Completed', 'On Hold', 'Cancelled'])
-    status_meaning = {
-        'In Progress': 'Work on the product is underway.',
-        'Completed': 'The product has been successfully delivered.',
-        'On Hold': 'The product delivery has been temporarily paused.',
-        'Cancelled': 'The order was cancelled before completion.'
-    }
-    meaning = status_meaning[product_status]
+    meaning = STATUS_MEANING[product_status]
     refund_amount = 0.0
     comments = ""
     if product_status == 'Completed':
@@ -89,7 +102,7 @@ def create_record():
         profit = price_of_service - cost_of_service
         loss = 0.0 if profit >= 0 else abs(profit)
         product_rating = random.randint(3, 5)
-        comments = fake.sentence(ext_word_list=["Excellent", "Great", "Loved", "Fantastic", "Highly recommend", "Will buy again"])
+        comments = fake.sentence(ext_word_list=POSITIVE_COMMENT_WORDS)
     
     elif product_status == 'In Progress' or product_status == 'On Hold':
         profit = 0.0
@@ -98,13 +111,13 @@ def create_record():
         comments = ''
     
     elif product_status == 'Cancelled':
-        cancellation_fee = 20.0
+        cancellation_fee = CANCELLATION_FEE
         refund_amount = max(0.0, price_of_service - cancellation_fee)
         revenue = cancellation_fee
         profit = revenue - cost_of_service
         loss = 0.0 if profit >= 0 else abs(profit)
         product_rating = random.choice([1, 2])
-        comments = fake.sentence(ext_word_list=["Cancellation due to delays", "Service was not as described"])
+        comments = fake.sentence(ext_word_list=CANCELLED_COMMENT_WORDS)
 
     payment_method = random.choice(['Credit Card', 'PayPal', 'Skrill', 'Airpay'])
     assistance_type = random.choice(["AI-powered virtual assistant", "Sales Representative"])
@@ -130,36 +143,208 @@ def create_record():
         "Profit": round(profit, 2), "Loss": round(loss, 2)
     }
 
-# Column order
-columns = [
-    "Customer ID", "Customer Name", "Email", "Phone", "Country", "Gender", "Age", "Company Name",
-    "Customer Type", "Subscription Type", "Benefits of Membership Type", "Subscription Duration",
-    "Subscription Date", "Subscription Price", "Product ID", "Product Type", "Inquries",
-    "Assistance Type", "Sales Rep ID", "Sales Rep Name", "Sales Rep Email", "Sales Rep Phone",
-    "Cost of Product", "Sales Amount", "Sales Date", "Sales Time", "Payment Method", "Demo Scheduled",
-    "Promotional Event Participation", "Promotional Event", "Response Time (days)", "Product Status",
-    "Meaning", "Refund Amount", "Product Rating", "Comments", "Profit", "Loss"
-]
-
-
-# Create an empty list to hold all records
-records = []
-
-# Generate 10 records
-for _ in range(100):
-    record = create_record()
-    records.append(record)
-
-# Convert to DataFrame
-df = pd.DataFrame(records, columns=columns)
-
-# Save to CSV
-filename = 'AI_Solution_Dataset.csv'
-try:
-    # Write with header if file doesn't exist, else append without header
-    with open(filename, 'a', newline='', encoding='utf-8') as f:
-        write_header = f.tell() == 0  # Check if file is empty
-        df.to_csv(f, index=False, header=write_header)
-except Exception as e:
-    print(f"Error saving data to CSV: {e}")
+# Column order (the dtypes live in schema.COLUMN_DTYPES)
+columns = list(COLUMN_DTYPES)
+
+
+# ----------------- BULK GENERATION -----------------
+# Faker-backed text columns are sampled from pre-generated pools so the cost of
+# Faker/phonenumbers is paid once per pool entry instead of once per row.
+DEFAULT_POOL_SIZE = 2000
+HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+
+# Function to build a pool of Faker values (a fresh call per entry)
+def _faker_pool(make_value, size):
+    return np.array([make_value() for _ in range(size)], dtype=object)
+
+
+# Function to generate n random version-4 UUID strings as one array
+def _uuid4_array(rng, n):
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    hex_chars = np.empty((n, 32), dtype=np.uint8)
+    hex_chars[:, 0::2] = HEX_DIGITS[raw >> 4]
+    hex_chars[:, 1::2] = HEX_DIGITS[raw & 0x0F]
+    dash = np.full((n, 1), ord("-"), dtype=np.uint8)
+    chars = np.hstack([hex_chars[:, :8], dash, hex_chars[:, 8:12], dash, hex_chars[:, 12:16], dash,
+                       hex_chars[:, 16:20], dash, hex_chars[:, 20:]])
+    return np.ascontiguousarray(chars).view("S36").ravel().astype(str).astype(object)
+
+
+# Function to draw n dates uniformly between DATE_START and DATE_END (inclusive)
+def _date_array(rng, n):
+    span = (DATE_END - DATE_START).days + 1
+    return np.datetime64(DATE_START, "D") + rng.integers(0, span, size=n).astype("timedelta64[D]")
+
+
+# Function to draw n "HH:MM:SS" strings, the format returned by fake.time()
+def _time_array(rng, n):
+    seconds = np.arange(24 * 3600)
+    table = np.array([f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in
+                      zip(seconds // 3600, seconds // 60 % 60, seconds % 60)], dtype=object)
+    return table[rng.integers(0, len(table), size=n)]
+
+
+# Function to generate n records at once as a columnar DataFrame
+def generate_records(n, seed=None, pool_size=DEFAULT_POOL_SIZE):
+    rng = np.random.default_rng(seed)
+    faker = Faker()
+    faker.seed_instance(seed)
+    pool_size = max(1, min(n, pool_size))
+
+    def pick(values):
+        values = np.asarray(values, dtype=object)
+        return values[rng.integers(0, len(values), size=n)]
+
+    # Pre-generated Faker pools
+    countries = _faker_pool(faker.country, pool_size)
+    phones = _faker_pool(lambda: generate_phone_number(None, faker), pool_size)
+    names = _faker_pool(faker.name, pool_size)
+    emails = _faker_pool(faker.email, pool_size)
+    companies = _faker_pool(faker.company, pool_size)
+    rep_phones = _faker_pool(faker.phone_number, pool_size)
+    positive_comments = _faker_pool(lambda: faker.sentence(ext_word_list=POSITIVE_COMMENT_WORDS), pool_size)
+    cancelled_comments = _faker_pool(lambda: faker.sentence(ext_word_list=CANCELLED_COMMENT_WORDS), pool_size)
+
+    subscription_type = pick(['Premium', 'Standard', 'Free'])
+    subscription_price = np.select([subscription_type == 'Premium', subscription_type == 'Standard'],
+                                   [50.0, 25.0], 0.0)
+    cost_of_service = np.round(rng.uniform(20, 100, size=n), 2)
+    price_of_service = np.round(rng.uniform(150, 300, size=n), 2)
+
+    # Profit / loss / refund / rating depend on the product status
+    status_codes = rng.integers(0, len(PRODUCT_STATUSES), size=n)
+    product_status = np.array(PRODUCT_STATUSES, dtype=object)[status_codes]
+    completed = product_status == 'Completed'
+    cancelled = product_status == 'Cancelled'
+    profit = np.select([completed, cancelled],
+                       [price_of_service - cost_of_service, CANCELLATION_FEE - cost_of_service], 0.0)
+    loss = np.where(profit < 0, np.abs(profit), 0.0)
+    refund_amount = np.where(cancelled, np.maximum(0.0, price_of_service - CANCELLATION_FEE), 0.0)
+    product_rating = np.select([completed, cancelled],
+                               [rng.integers(3, 6, size=n), rng.integers(1, 3, size=n)], 0)
+    comments = np.select([completed, cancelled], [pick(positive_comments), pick(cancelled_comments)], "")
+
+    # Sales rep details only exist for rep-assisted sales
+    assistance_type = pick(["AI-powered virtual assistant", "Sales Representative"])
+    no_rep = assistance_type != "Sales Representative"
+
+    def rep_column(values):
+        return np.where(no_rep, "N/A", values).astype(object)
+
+    data = {
+        "Customer ID": _uuid4_array(rng, n), "Customer Name": pick(names), "Email": pick(emails),
+        "Phone": pick(phones), "Country": pick(countries),
+        "Gender": pick(['Male', 'Female']), "Age": rng.integers(18, 66, size=n),
+        "Company Name": pick(companies), "Customer Type": pick(['Subscriber', 'Non-Subscriber']),
+        "Subscription Type": subscription_type,
+        "Benefits of Membership Type": pick(['Basic support', 'Exclusive offers']),
+        "Subscription Duration": pick(['Monthly', 'Yearly']), "Subscription Date": _date_array(rng, n),
+        "Subscription Price": subscription_price, "Product ID": rng.integers(100, 201, size=n),
+        "Product Type": pick(PRODUCT_TYPES),
+        "Inquries": pick(['Product question', 'Promotional event', 'Issue with product']),
+        "Assistance Type": assistance_type, "Sales Rep ID": rep_column(_uuid4_array(rng, n)),
+        "Sales Rep Name": rep_column(pick(names)), "Sales Rep Email": rep_column(pick(emails)),
+        "Sales Rep Phone": rep_column(pick(rep_phones)),
+        "Cost of Product": cost_of_service, "Sales Amount": price_of_service, "Sales Date": _date_array(rng, n),
+        "Sales Time": _time_array(rng, n), "Payment Method": pick(['Credit Card', 'PayPal', 'Skrill', 'Airpay']),
+        "Demo Scheduled": pick(['Yes', 'No']), "Promotional Event Participation": pick(['Yes', 'No']),
+        "Promotional Event": pick(PROMOTIONAL_EVENTS), "Response Time (days)": rng.integers(1, 11, size=n),
+        "Product Status": product_status,
+        "Meaning": np.array([STATUS_MEANING[s] for s in PRODUCT_STATUSES], dtype=object)[status_codes],
+        "Refund Amount": refund_amount, "Product Rating": product_rating, "Comments": comments,
+        "Profit": np.round(profit, 2), "Loss": np.round(loss, 2)
+    }
+    return pd.DataFrame(data, columns=columns)
+
+
+
+# ----------------- CLI -----------------
+# Rows are generated in fixed-size shards. Each shard gets its own seed spawned
+# from --seed, so the output only depends on --seed/--rows/--chunk-size and not
+# on how many worker processes produced it.
+DEFAULT_CSV = 'AI_Solution_Dataset.csv'
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+# Function to split `rows` into (shard index, shard rows, shard seed) tuples
+def plan_shards(rows, chunk_size, seed=None):
+    sizes = [min(chunk_size, rows - start) for start in range(0, rows, chunk_size)]
+    children = np.random.SeedSequence(seed).spawn(len(sizes))
+    return [(i, size, int(child.generate_state(1)[0])) for i, (size, child) in enumerate(zip(sizes, children))]
+
+
+# Function run in a worker process: generate one shard and return it
+def _generate_shard(shard):
+    _, size, shard_seed = shard
+    return generate_records(size, seed=shard_seed)
+
+
+# Function run in a worker process: generate one shard and write it as its own file
+def _write_shard(shard, out_dir):
+    index, size, shard_seed = shard
+    path = os.path.join(out_dir, f"part-{index:05d}.csv")
+    generate_records(size, seed=shard_seed).to_csv(path, index=False)
+    return path
+
+
+# Function run in a worker process: generate one shard and append it to a Parquet store
+def _append_shard(shard, out):
+    from storage import open_store
+    _, size, shard_seed = shard
+    open_store(out).append(generate_records(size, seed=shard_seed))
+    return out
+
+
+# Function to generate `rows` records across a process pool and save them.
+# `out` is a CSV file, a directory of per-shard CSV files (partitioned=True), or
+# a Parquet store directory (any path not ending in .csv).
+def generate_dataset(rows, out=DEFAULT_CSV, workers=1, seed=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                     partitioned=False):
+    # Imported here: storage pulls in pyarrow, which importers of the generator
+    # (e.g. backup.py for DEFAULT_CSV) should not pay for
+    from storage import open_store, ParquetStore
+    shards = plan_shards(rows, chunk_size, seed)
+    store = open_store(out)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if partitioned:
+            # One file per shard, written directly by the workers
+            os.makedirs(out, exist_ok=True)
+            return list(pool.map(_write_shard, shards, [out] * len(shards)))
+
+        if isinstance(store, ParquetStore):
+            # Every shard lands in its own uniquely named files, so workers can write concurrently
+            list(pool.map(_append_shard, shards, [out] * len(shards)))
+            return [out]
+
+        # Single CSV: append shards in order, header only if the file is new or empty
+        for df in pool.map(_generate_shard, shards):
+            store.append(df)
+    return [out]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic AI Solution sales records")
+    parser.add_argument("--rows", type=int, default=100, help="number of records to generate")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--seed", type=int, default=None, help="base seed for reproducible output")
+    parser.add_argument("--out", default=DEFAULT_CSV,
+                        help="CSV file to append to, Parquet store directory, or output directory with --partitioned")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per shard")
+    parser.add_argument("--partitioned", action="store_true", help="write one CSV file per shard into --out")
+    args = parser.parse_args(argv)
+
+    try:
+        paths = generate_dataset(args.rows, out=args.out, workers=args.workers, seed=args.seed,
+                                 chunk_size=args.chunk_size, partitioned=args.partitioned)
+    except Exception as e:
+        print(f"Error saving data to {args.out}: {e}")
+        return 1
+    print(f"Wrote {args.rows} records to {', '.join(paths) if len(paths) <= 3 else f'{len(paths)} files in {args.out}'}")
+    return 0
+
 
+if __name__ == "__main__":
+    raise SystemExit(main())
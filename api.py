@@ -1,57 +1,247 @@
 import streamlit as st
-import time
-import json
 import os
 import pandas as pd
 import plotly.express as px
-from io import BytesIO
+import plotly.graph_objects as go
 from streamlit_option_menu import option_menu
 from streamlit_autorefresh import st_autorefresh
-from Generating_data import create_record
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from data_loader import IncrementalCSVLoader
+from storage import open_store, CSVStore
+from kpi_cube import KPICube
+from rollups import SalesRollups
+from sketches import SketchCube, ERROR_BOUNDS
+from kpis import (sales_kpis, effectiveness_kpis, customer_counts, sales_summary_table, product_summary_table,
+                  customer_summary_table, subscription_summary_table, geographic_summary_table, promo_summary_table)
+from filters import FilterIndex, apply_filters
+from chart_data import (loss_by_product, sales_by_customer_type, rating_boxes, refund_boxes, response_time_bins,
+                        response_time_count_bins, sales_over_time, sketch_rating_boxes, sketch_refund_boxes)
+from schema import DERIVED_COLUMNS, NUMERIC_COLUMNS
+from data_cache import shared_cache, file_fingerprint
+from ingest import IngestionWorker
+from export import FORMATS as EXPORT_FORMATS, export_to_file
+from query_engine import AGGREGATE_COLUMNS, StoreAggregates, scan
+from instrumentation import timed, start_run, finish_run, timings, Profiler, start_metrics_server
 
 # ----------------- CONFIG -----------------
 st.set_page_config(page_title="Sales and Marketing Dashboard", layout="wide")
 
+# ----------------- INSTRUMENTATION -----------------
+# Every stage and expander below is timed into a process-wide registry. The admin
+# panel (SALES_ADMIN=1 or ?admin=1) shows the latencies and can profile a rerun;
+# SALES_METRICS_PORT serves them as Prometheus metrics, SALES_TIMING_LOG as JSON lines.
+ADMIN = os.environ.get('SALES_ADMIN') == '1' or st.query_params.get('admin') == '1'
+METRICS_PORT = int(os.environ.get('SALES_METRICS_PORT', 0))
+
+@st.cache_resource
+def serve_metrics(port):
+    return start_metrics_server(port)
+
+if METRICS_PORT:
+    serve_metrics(METRICS_PORT)
+
+# Runs are tagged with the browser session (None when the script runs bare)
+run_ctx = get_script_run_ctx()
+start_run(session=run_ctx.session_id if run_ctx else None)
+profiler = None
+if ADMIN and st.session_state.get('profiler_kind', 'Off') != 'Off':
+    try:
+        profiler = Profiler(st.session_state['profiler_kind']).start()
+    except ValueError as e:  # another session is being profiled in this thread
+        st.warning(f"Profiler not started: {e}")
+
+# Decorator rendering an expander whose content is computed lazily: the decorated
+# function runs (timed as `stage`) only while the expander is open. Opening or
+# closing it reruns the script.
+def section(label, stage, expanded=False):
+    def render(body):
+        expander = st.expander(label, expanded=expanded, key=f"section.{stage}", on_change="rerun")
+        if expander.open:
+            with expander, timed(stage):
+                body()
+        return body
+    return render
+
 # ----------------- AUTO REFRESH -----------------
 st_autorefresh(interval=60000, limit=None, key="data_refresh")
 
-# 1. Append ne# 1. Append new record
+# 1. Ingestion runs in a background worker (one per server process) that appends
+# records in batches; this script only reads. SALES_INGEST_PER_MINUTE=0 turns the
+# embedded worker off, e.g. when `python ingest.py` runs as its own process.
+# SALES_DATA_STORE may point at the CSV file (default) or at a Parquet store directory
 CSV_PATH = 'AI_Solution_Dataset.csv'
-new_record = create_record()
-new_df = pd.DataFrame([new_record])
+DATA_STORE = os.environ.get('SALES_DATA_STORE', CSV_PATH)
+INGEST_PER_MINUTE = float(os.environ.get('SALES_INGEST_PER_MINUTE', 1))
+store = open_store(DATA_STORE)
 
-# Ensure the file exists and is correctly written before reading
-if not os.path.exists(CSV_PATH):
-    new_df.to_csv(CSV_PATH, index=False)
-else:
-    with open(CSV_PATH, 'a', newline='', encoding='utf-8') as f:
-        new_df.to_csv(f, header=False, index=False)
+@st.cache_resource
+def start_ingestion(path, per_minute):
+    return IngestionWorker(open_store(path), rate=per_minute / 60).start()
+
+if INGEST_PER_MINUTE > 0:
+    start_ingestion(DATA_STORE, INGEST_PER_MINUTE)
+
+# 2. Load data through the process-wide cache: every session shares one copy of
+# the dataset and its aggregates, rebuilt once per change of the store's fingerprint
+data_version = file_fingerprint(DATA_STORE)
 
-# 2. Load data only once after writing
-def load_data():
+@st.cache_resource
+def get_loader(path):
+    # CSV: only rows appended since the last load are parsed. Kept out of the
+    # size-bounded shared_cache, whose evictions would drop the byte offset.
+    return IncrementalCSVLoader(path)
+
+# Parquet is columnar, so only the columns the tabs read are loaded (the filter and
+# aggregate columns, plus the numeric ones for the descriptive statistics); the
+# export reads every column from the store
+DASHBOARD_COLUMNS = AGGREGATE_COLUMNS + [c for c in NUMERIC_COLUMNS if c not in AGGREGATE_COLUMNS]
+
+def load_data(years=None):
     try:
-        df = pd.read_csv(CSV_PATH, on_bad_lines='skip')
-        df.columns = df.columns.str.strip()  # Clean column names
-        return df
+        if isinstance(store, CSVStore):
+            return shared_cache.get(("data", DATA_STORE), data_version,
+                                    lambda previous: get_loader(store.path).load())
+        # Parquet: only the selected year partitions and the dashboard columns are read
+        return shared_cache.get(("data", DATA_STORE, tuple(years or ())), data_version,
+                                lambda previous: store.read(columns=DASHBOARD_COLUMNS, years=years))
     except Exception as e:
         st.error(f"Failed to load data: {e}")
         st.stop()
 
-df = load_data()
+# Out-of-core mode (SALES_OUT_OF_CORE=1) for stores too large to load: the store is
+# never held in memory whole. Its aggregates are built by streaming it in chunks
+# (SALES_SCAN_WORKERS processes), scanning only what was added on each data version,
+# and the filtered export streams a scan with the sidebar predicates pushed down.
+OUT_OF_CORE = os.environ.get('SALES_OUT_OF_CORE') == '1'
+SCAN_WORKERS = int(os.environ.get('SALES_SCAN_WORKERS', 1))
+
+def store_aggregates(years=None):
+    key = ("aggregates", DATA_STORE) if isinstance(store, CSVStore) else ("aggregates", DATA_STORE, tuple(years or ()))
+    with timed("aggregates"):
+        return shared_cache.get(key, data_version,
+                                lambda previous: (previous or StoreAggregates()).sync(store, years, SCAN_WORKERS))
 
 # ----------------- SIDEBAR FILTERS -----------------
+# Parquet: Country / Product options come from every year, so picking a year does not
+# change the widgets' options (which would make Streamlit reset their selections)
+def parquet_filter_options():
+    def build(previous):
+        values = store.read(columns=["Country", "Product Type"])
+        return values["Country"].cat.categories.tolist(), values["Product Type"].cat.categories.tolist()
+    return shared_cache.get(("filter_options", DATA_STORE), data_version, build)
+
 st.sidebar.header("Filter Options")
-country_filter = st.sidebar.multiselect("Select Country", options=df['Country'].unique())
-product_filter = st.sidebar.multiselect("Select Product", options=df['Product Type'].unique())
-year_filter = st.sidebar.multiselect("Select Year", options=df['Sales Date'].astype(str).str[:4].unique())
-
-filtered_df = df.copy()
-if country_filter:
-    filtered_df = filtered_df[filtered_df['Country'].isin(country_filter)]
-if product_filter:
-    filtered_df = filtered_df[filtered_df['Product Type'].isin(product_filter)]
-if year_filter:
-    filtered_df = filtered_df[filtered_df['Sales Date'].astype(str).str[:4].isin(year_filter)]
+country_slot, product_slot = st.sidebar.empty(), st.sidebar.empty()
+if OUT_OF_CORE:
+    # Options come from the aggregates; Parquet year partitions are pruned from the scan
+    df = filtered_df = None
+    if isinstance(store, CSVStore):
+        aggregates = store_aggregates()
+        year_filter = st.sidebar.multiselect("Select Year", options=aggregates.values("Sales year"))
+    else:
+        year_options = shared_cache.get(("years", DATA_STORE), data_version, lambda previous: store.years())
+        year_filter = st.sidebar.multiselect("Select Year", options=year_options)
+        aggregates = store_aggregates(year_filter)
+    country_options, product_options = (aggregates.values("Country"), aggregates.values("Product Type")) \
+        if isinstance(store, CSVStore) else parquet_filter_options()
+elif isinstance(store, CSVStore):
+    with timed("load_data"):
+        df = load_data()
+    year_options = shared_cache.get(("years", DATA_STORE), data_version,
+                                    lambda previous: sorted(df['Year'].dropna().unique()))
+    year_filter = st.sidebar.multiselect("Select Year", options=year_options)
+    country_options, product_options = df['Country'].cat.categories, df['Product Type'].cat.categories
+else:
+    # Year options come from the partition directories, so the selected years are
+    # pushed down to the Parquet read
+    year_options = shared_cache.get(("years", DATA_STORE), data_version, lambda previous: store.years())
+    year_filter = st.sidebar.multiselect("Select Year", options=year_options)
+    with timed("load_data"):
+        df = load_data(years=year_filter)
+    country_options, product_options = parquet_filter_options()
+country_filter = country_slot.multiselect("Select Country", options=country_options)
+product_filter = product_slot.multiselect("Select Product", options=product_options)
+
+# Filters are answered from an inverted index of the loaded frame (built once per
+# data version) without copying it
+if not OUT_OF_CORE:
+    with timed("filters"):
+        index_key = ("filter_index", DATA_STORE) if isinstance(store, CSVStore) else ("filter_index", DATA_STORE, tuple(year_filter))
+        filter_index = shared_cache.get(index_key, data_version, lambda previous: FilterIndex(df))
+        filtered_df = apply_filters(df, country_filter, product_filter, year_filter, index=filter_index)
+
+# Approximate analytics: distinct/repeat/churned customers, box plots and the descriptive
+# statistics come from mergeable sketches per cube cell instead of scans of the rows.
+# SALES_APPROXIMATE=1 turns it on by default; out of core it is always on.
+approximate = st.sidebar.toggle("Approximate analytics", value=OUT_OF_CORE or os.environ.get('SALES_APPROXIMATE') == '1',
+                                help="Faster on large data; figures are estimates", disabled=OUT_OF_CORE)
+approximate = approximate or OUT_OF_CORE
+if approximate:
+    st.sidebar.caption(f"Customers and retention from a customer sample (errors shown with the tables), "
+                       f"quantiles ±{ERROR_BOUNDS['quantile']:.0%}")
+
+# ----------------- KPI CUBE -----------------
+# KPIs and summary tables are answered from a pre-aggregated cube sliced by the
+# sidebar filters. The CSV cube only aggregates rows appended since its last sync.
+def build_cube(previous):
+    if isinstance(store, CSVStore):
+        return (previous or KPICube()).sync(df, generation=get_loader(store.path).full_reloads)
+    return KPICube.from_frame(df)
+
+filter_key = (tuple(country_filter), tuple(product_filter), tuple(year_filter))
+cube_key = ("cube", DATA_STORE) if isinstance(store, CSVStore) else ("cube", DATA_STORE, filter_key[2])
+if OUT_OF_CORE:
+    cube = aggregates.cube
+else:
+    with timed("cube"):
+        cube = shared_cache.get(cube_key, data_version, build_cube)
+
+# Everything a tab or section shows is computed on first use and memoized per
+# filter state, so only the selected tab and the open sections do any work.
+# Charts get pre-aggregated, binned or downsampled data, never the raw rows.
+def memo(name, build):
+    return shared_cache.get((name, DATA_STORE) + filter_key, data_version, lambda previous: build())
+
+def cube_slice():
+    return memo("cube_slice", lambda: cube.slice(countries=country_filter, products=product_filter, years=year_filter))
+
+# Daily/monthly/yearly rollups for the time series, kept in step like the cube and
+# built on first use
+def build_rollups(previous):
+    if isinstance(store, CSVStore):
+        return (previous or SalesRollups()).sync(df, generation=get_loader(store.path).full_reloads)
+    return SalesRollups.from_frame(df)
+
+def rollup_slice():
+    rollups_key = ("rollups", DATA_STORE) if isinstance(store, CSVStore) else ("rollups", DATA_STORE, filter_key[2])
+    if OUT_OF_CORE:
+        rollups = aggregates.rollups
+    else:
+        with timed("rollups"):
+            rollups = shared_cache.get(rollups_key, data_version, build_rollups)
+    return memo("rollup_slice", lambda: rollups.slice(countries=country_filter, products=product_filter, years=year_filter))
+
+# Sketches per cube cell for the approximate analytics, kept in step like the cube and
+# built on first use
+def build_sketches(previous):
+    if isinstance(store, CSVStore):
+        return (previous or SketchCube()).sync(df, generation=get_loader(store.path).full_reloads)
+    return SketchCube.from_frame(df)
+
+def sketch_slice():
+    sketches_key = ("sketches", DATA_STORE) if isinstance(store, CSVStore) else ("sketches", DATA_STORE, filter_key[2])
+    if OUT_OF_CORE:
+        sketches = aggregates.sketches
+    else:
+        with timed("sketches"):
+            sketches = shared_cache.get(sketches_key, data_version, build_sketches)
+    return memo("sketch_slice", lambda: sketches.slice(countries=country_filter, products=product_filter, years=year_filter))
+
+def customers():
+    # Distinct, repeat and churned customers: the only figures needing raw Customer IDs
+    if approximate:
+        return memo("customers_approx", lambda: sketch_slice().customers())
+    return memo("customers", lambda: customer_counts(filtered_df["Customer ID"], filtered_df["Product Status"]))
 
 # ----------------- NAVIGATION MENU -----------------
 selected = option_menu(
@@ -68,64 +258,59 @@ selected = option_menu(
     }
 )
 
-# ----------------- EXPORT CSV -----------------
+# ----------------- EXPORT -----------------
+# The file is only produced when the button is clicked, serialized chunk by chunk
+# (out of core, and for Parquet whose loaded frame only has the dashboard columns:
+# as the chunks of a store scan come in)
+def export_rows():
+    if OUT_OF_CORE or not isinstance(store, CSVStore):
+        return scan(store, countries=country_filter, products=product_filter, years=year_filter)
+    return filtered_df
+
 st.subheader("Export Filtered Data")
-towrite = BytesIO()
-filtered_df.to_csv(towrite, index=False)
-towrite.seek(0)
-st.download_button("Export to CSV", data=towrite, file_name="Filtered_AI_Data.csv", mime="text/csv")
+export_col1, export_col2 = st.columns([1, 3])
+export_format = export_col1.selectbox("Format", options=list(EXPORT_FORMATS),
+                                      format_func=lambda fmt: EXPORT_FORMATS[fmt]["label"])
+export_col2.download_button(
+    f"Export to {EXPORT_FORMATS[export_format]['label']}",
+    data=lambda: export_to_file(export_rows(), export_format),
+    file_name=f"Filtered_AI_Data.{EXPORT_FORMATS[export_format]['extension']}",
+    mime=EXPORT_FORMATS[export_format]["mime"]
+)
 
 #-------------------- tabs-----------------
 if selected == "Sales":
     st.title("📈 Sales Performance Dashboard")
+    with timed("sales.kpis"):
+        kpis = memo("sales_kpis", lambda: sales_kpis(filtered_df, cube_slice()))
 
     # --- KPIs: Quick Glance at Sales Health ---
     st.markdown("###  Key Performance Indicators")
-    total_customers = filtered_df["Customer ID"].count()
-    total_countries = filtered_df["Country"].nunique()
-    total_sales_revenue = filtered_df[filtered_df["Product Status"] == "Completed"]["Sales Amount"].sum()
-    total_profit = filtered_df['Profit'].sum()
-    total_loss = filtered_df['Loss'].sum()
-    total_job_request = filtered_df["Product Type"].count()
-    subscribers = filtered_df[filtered_df["Subscription Type"].isin(["Premium", "Standard"])].shape[0]
-    subscriptions_price = filtered_df[filtered_df["Subscription Type"] != "Free"]["Subscription Price"].sum()
-    AI_assistant = filtered_df[filtered_df["Assistance Type"] == 'AI-powered virtual assistant'].shape[0]
-    sales_rep = filtered_df[filtered_df["Assistance Type"] == 'Sales Representative'].shape[0]
-    top_selling = filtered_df["Product Type"].value_counts().idxmax()
-
     kpi_row1 = st.columns(3)
-    kpi_row1[0].metric(label=" Total Sales Revenue", value=f"${total_sales_revenue:,.2f}")
-    kpi_row1[1].metric(label=" Total Profit", value=f"${total_profit:,.2f}")
-    kpi_row1[2].metric(label="Total Loss", value=f"${total_loss:,.2f}")
+    kpi_row1[0].metric(label=" Total Sales Revenue", value=f"${kpis.total_sales_revenue:,.2f}")
+    kpi_row1[1].metric(label=" Total Profit", value=f"${kpis.total_profit:,.2f}")
+    kpi_row1[2].metric(label="Total Loss", value=f"${kpis.total_loss:,.2f}")
 
     kpi_row2 = st.columns(3)
-    kpi_row2[0].metric(label=" Total Customers", value=total_customers)
-    kpi_row2[1].metric(label=" Countries Reached", value=total_countries)
-    kpi_row2[2].metric(label=" Total Job Requests", value=total_job_request)
+    kpi_row2[0].metric(label=" Total Customers", value=kpis.total_customers)
+    kpi_row2[1].metric(label=" Countries Reached", value=kpis.total_countries)
+    kpi_row2[2].metric(label=" Total Job Requests", value=kpis.total_job_requests)
 
     kpi_row3 = st.columns(3)
-    kpi_row3[0].metric(label=" AI Assistant Requests", value=AI_assistant)
-    kpi_row3[1].metric(label="Sales Rep Requests", value=sales_rep)
-    kpi_row3[2].metric(label="Top Selling Product", value=top_selling)
+    kpi_row3[0].metric(label=" AI Assistant Requests", value=kpis.ai_assistant_requests)
+    kpi_row3[1].metric(label="Sales Rep Requests", value=kpis.sales_rep_requests)
+    kpi_row3[2].metric(label="Top Selling Product", value=kpis.top_selling_product)
 
 
     kpi_row4 = st.columns(2)
-    kpi_row4[0].metric(label=" Total Subscribers", value=subscribers)
-    kpi_row4[1].metric(label=" Subscription Revenue", value=f"${subscriptions_price:,.2f}")
+    kpi_row4[0].metric(label=" Total Subscribers", value=kpis.subscribers)
+    kpi_row4[1].metric(label=" Subscription Revenue", value=f"${kpis.subscription_revenue:,.2f}")
 
     # --- Revenue Over Time ---
-    with st.expander("📅 Revenue Trends Over Time", expanded=False):
-        completed_df = filtered_df[filtered_df['Product Status'] == 'Completed'].copy()
-        # Fix Sales Date column only in this slice
-        completed_df['Sales Date'] = pd.to_datetime(completed_df['Sales Date'], errors='coerce')
-        completed_df['Month'] = completed_df['Sales Date'].dt.month_name()
-
+    @section("📅 Revenue Trends Over Time", "sales.revenue_trends", expanded=False)
+    def _revenue_trends():
         fig2 = px.bar(
-            completed_df.groupby('Month')['Sales Amount'].sum()
-            .reindex([
-                'January', 'February', 'March', 'April', 'May', 'June',
-                'July', 'August', 'September', 'October', 'November', 'December'
-            ]).reset_index(),
+            kpis.monthly_revenue,
             x='Month',
             y='Sales Amount',
             title=' Monthly Sales Revenue'
@@ -134,18 +319,10 @@ if selected == "Sales":
         st.plotly_chart(fig2, use_container_width=True)
 
     # --- Product-Level Performance ---
-    with st.expander("🏷️ Product Sales Insights", expanded=False):
-        # Ensure you're using only completed sales for meaningful sales metrics
-        completed_df = filtered_df[filtered_df['Product Status'] == 'Completed']
-
-        def get_top_least_products(data):
-            product_sales = data.groupby("Product Type")["Sales Amount"].sum().reset_index()
-            product_sales = product_sales.sort_values(by="Sales Amount", ascending=False)
-            top_10 = product_sales.head(10)
-            least_10 = product_sales.tail(10)
-            return top_10, least_10
-
-        top_products, least_products = get_top_least_products(completed_df)
+    @section("🏷️ Product Sales Insights", "sales.products", expanded=False)
+    def _products():
+        # Only completed sales count towards product sales
+        top_products = kpis.product_sales.head(10)
 
         fig_top = px.bar(
             top_products,
@@ -155,10 +332,8 @@ if selected == "Sales":
         )
         fig_top.update_layout(xaxis_tickangle=-45)
 
-        filtered_sorted_loss = filtered_df.sort_values(by='Loss', ascending=False)  # no .head()
-
         fig_loss = px.bar(
-            filtered_sorted_loss,
+            memo("loss_by_product", lambda: loss_by_product(cube_slice())),
             x='Product Type',
             y='Loss',
             title=' Loss by Product Type'
@@ -168,8 +343,9 @@ if selected == "Sales":
         st.plotly_chart(fig_loss, use_container_width=True)
 
     # --- Country-Level Performance ---
-    with st.expander("🌐 Country-Level Sales Breakdown", expanded=False):
-        top_countries = completed_df.groupby('Country')['Sales Amount'].sum().sort_values(ascending=False).head(10).reset_index()
+    @section("🌐 Country-Level Sales Breakdown", "sales.countries", expanded=False)
+    def _countries():
+        top_countries = kpis.country_sales.head(10)
 
         fig_top_countries = px.bar(
             top_countries,
@@ -182,13 +358,13 @@ if selected == "Sales":
         st.plotly_chart(fig_top_countries, use_container_width=True)
 
     # --- Subscription Sales Breakdown ---
-    with st.expander(" Subscription-Based Revenue Analysis", expanded=False):
+    @section(" Subscription-Based Revenue Analysis", "sales.subscriptions", expanded=False)
+    def _subscriptions():
         fig_col1, fig_col2 = st.columns(2)
 
         with fig_col1:
-            subscription_price_by_type = filtered_df.groupby('Subscription Type')['Subscription Price'].sum().reset_index()
             fig_subs = px.pie(
-                subscription_price_by_type,
+                kpis.subscription_price_by_type,
                 names='Subscription Type',
                 values='Subscription Price',
                 title=' Revenue Distribution by Subscription Type'
@@ -196,8 +372,8 @@ if selected == "Sales":
             st.plotly_chart(fig_subs, use_container_width=True)
 
         with fig_col2:
-            fig_customer_type = px.histogram(
-                filtered_df,
+            fig_customer_type = px.bar(
+                memo("sales_by_customer_type", lambda: sales_by_customer_type(cube_slice())),
                 x='Customer Type',
                 y='Sales Amount',
                 title=' Customer Type vs Sales Amount'
@@ -216,65 +392,71 @@ elif selected == "Effectiveness":
             stars += "✬"
         return stars
 
-    filtered_df['Product Rating'] = pd.to_numeric(filtered_df['Product Rating'], errors='coerce').fillna(0)
-
-    avg_rating = filtered_df['Product Rating'].mean()
-    stars = get_star_rating(avg_rating)
-    refund_rate = filtered_df['Refund Amount'].sum()
-    avg_response_time = filtered_df['Response Time (days)'].mean()
-    demo = filtered_df[filtered_df["Demo Scheduled"] == 'Yes'].shape[0]
-    total_promotion = filtered_df[filtered_df["Promotional Event Participation"] == 'Yes'].shape[0]
-    completed = filtered_df[filtered_df['Product Status'] == 'Completed']
-    conversion_rate = round((len(completed) / demo) * 100, 2) if demo > 0 else 0
-
-    with st.expander("📌 Effectiveness KPIs", expanded=True):
+    # Box plots drawn from precomputed quartiles and whiskers
+    def box_figure(boxes, value, title):
+        # A selection without values (e.g. no refunds) gets an empty chart
+        fig = go.Figure(go.Box(
+            x=boxes['Product Type'], q1=boxes['q1'], median=boxes['median'], q3=boxes['q3'],
+            lowerfence=boxes['lowerfence'], upperfence=boxes['upperfence']
+        ) if len(boxes) else None)
+        fig.update_layout(title=title, xaxis_title="Product Type", yaxis_title=value)
+        return fig
+
+    with timed("effectiveness.kpis_data"):
+        kpis = memo("effectiveness_kpis", lambda: effectiveness_kpis(filtered_df, cube_slice()))
+    stars = get_star_rating(kpis.avg_rating)
+
+    @section("📌 Effectiveness KPIs", "effectiveness.kpis", expanded=True)
+    def _kpis():
         kpis_row1 = st.columns(3)
         kpis_row2 = st.columns(3)
 
-        kpis_row1[0].metric("Avg. Product Rating", f"{avg_rating:.2f}  {stars}")
-        kpis_row1[1].metric("Avg. Response Time (days)", f"{avg_response_time:.2f}")
-        kpis_row1[2].metric("Refund Amount", f"{refund_rate:.2f}")
+        kpis_row1[0].metric("Avg. Product Rating", f"{kpis.avg_rating:.2f}  {stars}")
+        kpis_row1[1].metric("Avg. Response Time (days)", f"{kpis.avg_response_time:.2f}")
+        kpis_row1[2].metric("Refund Amount", f"{kpis.refund_amount:.2f}")
 
-        kpis_row2[0].metric("Scheduled demos", value=demo)
-        kpis_row2[1].metric("Event Participation", value=total_promotion)
-        kpis_row2[2].metric("Conversion rate", value=conversion_rate)
+        kpis_row2[0].metric("Scheduled demos", value=kpis.scheduled_demos)
+        kpis_row2[1].metric("Event Participation", value=kpis.event_participation)
+        kpis_row2[2].metric("Conversion rate", value=kpis.conversion_rate)
 
     # --- Product Ratings ---
-    with st.expander("⭐ Ratings by Product Performance", expanded=False):
-        top_selling = filtered_df["Product Type"].value_counts().nlargest(5).index
-        least_selling = filtered_df["Product Type"].value_counts().nsmallest(5).index
-
-        fig_top = px.box(
-            filtered_df[filtered_df["Product Type"].isin(top_selling)],
-            x="Product Type", y="Product Rating",
-            title="Top-Selling Products: Rating Distribution"
-        )
+    @section("⭐ Ratings by Product Performance", "effectiveness.ratings", expanded=False)
+    def _ratings():
+        boxes = memo("rating_boxes_approx", lambda: sketch_rating_boxes(sketch_slice(), cube_slice())) if approximate \
+            else memo("rating_boxes", lambda: rating_boxes(filtered_df))
+        fig_top = box_figure(boxes, "Product Rating",
+                             "Top-Selling Products: Rating Distribution")
         st.plotly_chart(fig_top, use_container_width=True)
 
     # --- Refund Distribution ---
-    with st.expander("💸 Refund Analysis by Product", expanded=False):
-        fig_refund = px.box(
-            filtered_df[filtered_df["Refund Amount"] > 0],
-            x="Product Type", y="Refund Amount",
-            title="Refund Distribution by Product Type"
-        )
+    @section("💸 Refund Analysis by Product", "effectiveness.refunds", expanded=False)
+    def _refunds():
+        boxes = memo("refund_boxes_approx", lambda: sketch_refund_boxes(sketch_slice())) if approximate \
+            else memo("refund_boxes", lambda: refund_boxes(filtered_df))
+        fig_refund = box_figure(boxes, "Refund Amount",
+                                "Refund Distribution by Product Type")
         st.plotly_chart(fig_refund, use_container_width=True)
 
     # --- Response Time Distribution ---
-    with st.expander("⏱️ Response Time Analysis", expanded=False):
-        fig_hist = px.histogram(
-            filtered_df,
-            x="Response Time (days)", nbins=10,
-            title="Distribution of Product Completion Times"
-        )
+    @section("⏱️ Response Time Analysis", "effectiveness.response_time", expanded=False)
+    def _response_time():
+        if OUT_OF_CORE:
+            bins = memo("response_time_bins", lambda: response_time_count_bins(
+                aggregates.response_time_counts(country_filter, product_filter, year_filter)))
+        else:
+            bins = memo("response_time_bins", lambda: response_time_bins(filtered_df))
+        fig_hist = go.Figure(go.Bar(
+            x=(bins['Start'] + bins['End']) / 2, y=bins['Count'], width=bins['End'] - bins['Start']
+        ))
+        fig_hist.update_layout(title="Distribution of Product Completion Times",
+                               xaxis_title="Response Time (days)", yaxis_title="count", bargap=0)
         st.plotly_chart(fig_hist, use_container_width=True)
 
     # --- Product Status ---
-    with st.expander("📦 Product Status Overview", expanded=True):
-        status_counts = filtered_df['Product Status'].value_counts().reset_index()
-        status_counts.columns = ['Product Status', 'Count']
+    @section("📦 Product Status Overview", "effectiveness.status", expanded=True)
+    def _status():
         fig_status = px.bar(
-            status_counts,
+            kpis.status_counts,
             x='Product Status', y='Count', color='Product Status',
             title='Product Status Distribution', text='Count'
         )
@@ -285,105 +467,92 @@ elif selected == "Analysis":
     st.subheader("🧾 Deeper Data Analysis")
 
     # 1. Sales Performance Summary
-    with st.expander("💰 Sales Performance Summary", expanded=True):
-        sales_summary = pd.DataFrame({
-            "Total Sales Amount": [filtered_df["Sales Amount"].sum()],
-            "Total Transactions": [filtered_df["Customer ID"].count()],
-            "Average Sales Amount": [filtered_df["Sales Amount"].mean()],
-            "Total Profit": [filtered_df["Profit"].sum()],
-            "Total Loss": [filtered_df["Loss"].sum()],
-            "Total Refunds": [filtered_df["Refund Amount"].sum()]
-        })
-        st.dataframe(sales_summary, use_container_width=True)
+    @section("💰 Sales Performance Summary", "analysis.sales_summary", expanded=True)
+    def _sales_summary():
+        st.dataframe(memo("sales_summary", lambda: sales_summary_table(cube_slice())), use_container_width=True)
 
     # 2. Product Performance Summary
-    with st.expander("📦 Product Performance Summary", expanded=True):
-        product_summary = filtered_df.groupby("Product Type").agg({
-            "Sales Amount": "sum",
-            "Profit": "sum",
-            "Customer ID": "count",
-            "Product Rating": "mean"
-        }).rename(columns={"Customer ID": "Total Units Sold"}).reset_index()
-
-        product_summary = product_summary.sort_values(by="Sales Amount", ascending=False)
-        st.dataframe(product_summary, use_container_width=True)
+    @section("📦 Product Performance Summary", "analysis.product_summary", expanded=True)
+    def _product_summary():
+        st.dataframe(memo("product_summary", lambda: product_summary_table(cube_slice())), use_container_width=True)
 
     # 3. Customer Insights Summary
-    with st.expander("👥 Customer Insights Summary", expanded=True):
-        customer_summary = filtered_df.groupby("Customer Type").agg({
-            "Customer ID": "count",
-            "Sales Amount": "sum"
-        }).rename(columns={"Customer ID": "Total Customers"}).reset_index()
-
-        total_customers = filtered_df["Customer ID"].nunique()
-        repeat_customers = filtered_df[filtered_df.duplicated(subset=["Customer ID"], keep=False)]["Customer ID"].nunique()
-        retention_rate = (repeat_customers / total_customers) * 100 if total_customers > 0 else 0
-
-        customer_summary["Retention Rate (%)"] = retention_rate
-        st.dataframe(customer_summary, use_container_width=True)
+    @section("👥 Customer Insights Summary", "analysis.customer_summary", expanded=True)
+    def _customer_summary():
+        if approximate:
+            errors = memo("customer_errors", lambda: sketch_slice().errors())
+            st.caption(f"Approximate: customers ±{errors['distinct']:.1%}, retention ±{errors['share'] * 100:.1f} pts "
+                       "(one standard error)")
+        st.dataframe(memo("customer_summary", lambda: customer_summary_table(cube_slice(), customers())), use_container_width=True)
 
     # 4. Subscription Analysis
-    with st.expander("📊 Subscription Analysis", expanded=True):
-        subscription_summary = filtered_df.groupby("Subscription Type").agg({
-            "Sales Amount": "sum",
-            "Customer ID": "count"
-        }).rename(columns={"Customer ID": "Total Active Subscriptions"}).reset_index()
-
-        churned_customers = filtered_df[filtered_df["Product Status"] == "Cancelled"]["Customer ID"].nunique()
-        total_subscriptions = subscription_summary["Total Active Subscriptions"].sum()
-        churn_rate = (churned_customers / total_subscriptions) * 100 if total_subscriptions > 0 else 0
-
-        subscription_summary["Churn Rate (%)"] = churn_rate
-        st.dataframe(subscription_summary, use_container_width=True)
+    @section("📊 Subscription Analysis", "analysis.subscription_summary", expanded=True)
+    def _subscription_summary():
+        st.dataframe(memo("subscription_summary", lambda: subscription_summary_table(cube_slice(), customers())), use_container_width=True)
 
     # 5. Geographic Performance Summary
-    with st.expander("🌍 Geographic Performance Summary", expanded=True):
-        geographic_summary = filtered_df.groupby("Country").agg({
-            "Sales Amount": "sum",
-            "Customer ID": "count"
-        }).rename(columns={"Customer ID": "Total Transactions"}).reset_index()
-
-        geographic_summary = geographic_summary.sort_values(by="Sales Amount", ascending=False)
-        st.dataframe(geographic_summary, use_container_width=True)
+    @section("🌍 Geographic Performance Summary", "analysis.geographic_summary", expanded=True)
+    def _geographic_summary():
+        st.dataframe(memo("geographic_summary", lambda: geographic_summary_table(cube_slice())), use_container_width=True)
 
     # 6. Promotional Effectiveness
-    with st.expander("🎉 Promotional Effectiveness", expanded=True):
-        promo_summary = filtered_df[filtered_df["Promotional Event Participation"] == "Yes"].groupby("Promotional Event").agg({
-            "Sales Amount": "sum",
-            "Customer ID": "count"
-        }).rename(columns={"Customer ID": "Total Transactions"}).reset_index()
-
-        st.dataframe(promo_summary, use_container_width=True)
+    @section("🎉 Promotional Effectiveness", "analysis.promotions", expanded=True)
+    def _promotions():
+        st.dataframe(memo("promo_summary", lambda: promo_summary_table(cube_slice())), use_container_width=True)
 
     # 7. Product Status Overview (Added as important for sales team)
-    with st.expander("📦 Product Status Overview", expanded=True):
-        status_counts = filtered_df['Product Status'].value_counts().reset_index()
-        status_counts.columns = ['Product Status', 'Count']
-        st.dataframe(status_counts, use_container_width=True)
+    @section("📦 Product Status Overview", "analysis.status", expanded=True)
+    def _status():
+        st.dataframe(memo("effectiveness_kpis", lambda: effectiveness_kpis(filtered_df, cube_slice())).status_counts,
+                     use_container_width=True)
 
     # 8. Timely Sales Analysis: Daily, Monthly, Yearly Sales
-    with st.expander("⏰ Timely Sales Analysis", expanded=True):
-        completed_df = filtered_df[filtered_df['Product Status'] == 'Completed'].copy()
-        completed_df['Sales Date'] = pd.to_datetime(completed_df['Sales Date'], errors='coerce')
-        completed_df['Day'] = completed_df['Sales Date'].dt.date
-        completed_df['Month'] = completed_df['Sales Date'].dt.to_period('M').dt.to_timestamp()
-        completed_df['Year'] = completed_df['Sales Date'].dt.year
-
-        daily_sales = completed_df.groupby('Day')['Sales Amount'].sum().reset_index()
-        monthly_sales = completed_df.groupby('Month')['Sales Amount'].sum().reset_index()
-        yearly_sales = completed_df.groupby('Year')['Sales Amount'].sum().reset_index()
-
+    @section("⏰ Timely Sales Analysis", "analysis.timely_sales", expanded=True)
+    def _timely_sales():
+        # Read from the rollups; long series are downsampled to a fixed number of points (LTTB)
+        charts = memo("sales_over_time", lambda: sales_over_time(rollup_slice()))
         st.markdown("### Daily Sales")
-        st.line_chart(daily_sales.rename(columns={"Day": "index"}).set_index("index")['Sales Amount'])
+        st.line_chart(charts["daily_sales"].rename(columns={"Day": "index"}).set_index("index")['Sales Amount'])
 
         st.markdown("### Monthly Sales")
-        st.line_chart(monthly_sales.rename(columns={"Month": "index"}).set_index("index")['Sales Amount'])
+        st.line_chart(charts["monthly_sales"].rename(columns={"Month": "index"}).set_index("index")['Sales Amount'])
 
         st.markdown("### Yearly Sales")
-        st.line_chart(yearly_sales.rename(columns={"Year": "index"}).set_index("index")['Sales Amount'])
+        st.line_chart(charts["yearly_sales"].rename(columns={"Year": "index"}).set_index("index")['Sales Amount'])
 
     # Descriptive Statistics Summary
-    with st.expander("📌 Descriptive Statistics Overview", expanded=False):
+    @section("📌 Descriptive Statistics Overview", "analysis.describe", expanded=False)
+    def _describe():
         st.write("This section provides a statistical overview of key numerical metrics in the dataset, including counts, means, and standard deviations.")
-        st.dataframe(filtered_df.describe().round(2), use_container_width=True)
-
+        if approximate:
+            st.caption("Approximate: sketched columns only; quartiles are estimates")
+            st.dataframe(memo("describe_approx", lambda: sketch_slice().describe().round(2)), use_container_width=True)
+        else:
+            st.dataframe(memo("describe", lambda: filtered_df.drop(columns=DERIVED_COLUMNS).select_dtypes('number').describe().round(2)),
+                         use_container_width=True)
+
+# ----------------- ADMIN PANEL -----------------
+run = finish_run()
+if ADMIN:
+    if profiler is not None:
+        profiler.stop()
+    st.divider()
+    st.subheader("🛠️ Admin: Performance")
+    st.radio("Profile the next rerun with", options=["Off"] + list(Profiler.KINDS), key="profiler_kind",
+             horizontal=True)
+    if profiler is not None:
+        with st.expander(f"{profiler.kind} report for this run", expanded=False):
+            st.code(profiler.report())
+
+    st.markdown("**This run**")
+    st.dataframe(pd.DataFrame(run["stages"], columns=["Stage", "Seconds"]), use_container_width=True)
+
+    st.markdown("**All reruns (this server process)**")
+    summary = pd.DataFrame(timings.summary())
+    st.dataframe(summary.round(2), use_container_width=True)
+    if not summary.empty:
+        stage = st.selectbox("Latency histogram for", options=summary["stage"])
+        fig_latency = px.histogram(pd.DataFrame({"ms": [s * 1000 for s in timings.samples(stage)]}), x="ms",
+                                   nbins=30, title=f"{stage}: last {len(timings.samples(stage))} runs (ms)")
+        st.plotly_chart(fig_latency, use_container_width=True)
+    st.json(shared_cache.stats())
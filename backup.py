@@ -0,0 +1,289 @@
+import os
+import glob
+import gzip
+import json
+import re
+import time
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime
+
+from Generating_data import DEFAULT_CSV
+
+DEFAULT_BACKUP_DIR = os.path.join("backups", "snapshots")
+# Bytes read, hashed and compressed per step
+COPY_CHUNK_BYTES = 1024 * 1024
+# Bytes before the end of the last snapshot that must be unchanged for a file to
+# count as appended to (checked instead of re-hashing the whole prefix)
+TAIL_BYTES = 4096
+# Default retention: newest snapshot of each of the last 24 hours, 7 days and 4 weeks
+DEFAULT_RETENTION = {"hourly": 24, "daily": 7, "weekly": 4}
+RETENTION_BUCKETS = {"hourly": "%Y-%m-%d %H", "daily": "%Y-%m-%d", "weekly": "%G-W%V"}
+# Name of the full copies `import` adds, e.g. backup_20250410_094627.csv
+BACKUP_NAME = re.compile(r"backup_(\d{8}_\d{6})\.csv")
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# Function to read the header line and the TAIL_BYTES ending at `size`
+def _read_marks(f, size):
+    f.seek(0)
+    header = f.readline()
+    start = max(0, size - TAIL_BYTES)
+    f.seek(start)
+    return _digest(header), _digest(f.read(size - start))
+
+
+# Snapshot manager for an append-only CSV file.
+#
+# Each snapshot is a list of objects whose concatenation is the file as it was.
+# A snapshot of a file that was only appended to since the previous snapshot
+# stores just the appended bytes as one new object and reuses the previous
+# snapshot's objects; a rewritten or truncated file starts a new chain with a
+# full copy. Objects are gzip-compressed and named by the SHA-256 of their
+# content, so identical data is stored once. The snapshot list lives in
+# manifest.json; prune() applies the retention policy and deletes objects no
+# remaining snapshot refers to.
+class BackupManager:
+    def __init__(self, root=DEFAULT_BACKUP_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.snapshots = self._read_manifest()
+
+    # ---------- snapshots ----------
+    def snapshot(self, path, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        previous = self.snapshots[-1] if self.snapshots else None
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if previous is not None and self._appended(f, previous, size):
+                if size == previous["size"]:
+                    return previous  # nothing new since the last snapshot
+                start, objects = previous["size"], list(previous["objects"])
+            else:
+                start, objects = 0, []
+            f.seek(start)
+            objects.append(self._put(f, size - start))
+            header, tail = _read_marks(f, size)
+
+        snapshot = {"id": self._new_id(timestamp), "time": timestamp, "source": os.path.abspath(path),
+                    "size": size, "header": header, "tail": tail, "objects": objects}
+        self.snapshots.append(snapshot)
+        self._write_manifest()
+        return snapshot
+
+    # Function to take a snapshot of a copy (e.g. an old backup file) at `timestamp`,
+    # inserting it in time order. A copy that only appends to the nearest earlier
+    # snapshot reuses that snapshot's objects and stores just the appended bytes.
+    def add_copy(self, path, timestamp):
+        earlier = [s for s in self.snapshots if s["time"] <= timestamp]
+        previous = earlier[-1] if earlier else None
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if previous is not None and self._appended(f, previous, size, same_source=False):
+                start, objects = previous["size"], list(previous["objects"])
+            else:
+                start, objects = 0, []
+            f.seek(start)
+            if size > start:
+                objects.append(self._put(f, size - start))
+            header, tail = _read_marks(f, size)
+        snapshot = {"id": self._new_id(timestamp), "time": timestamp, "source": os.path.abspath(path),
+                    "size": size, "header": header, "tail": tail, "objects": objects}
+        self.snapshots.append(snapshot)
+        self.snapshots.sort(key=lambda s: s["time"])
+        self._write_manifest()
+        return snapshot
+
+    # Function to tell whether the open file `f` of `size` bytes is the snapshot
+    # `previous` with rows appended: same header and same bytes before its end. Unless
+    # `same_source` is False, the file must also be the one the snapshot was taken of.
+    def _appended(self, f, previous, size, same_source=True):
+        if size < previous["size"] or (same_source and previous["source"] != os.path.abspath(f.name)):
+            return False
+        return _read_marks(f, previous["size"]) == (previous["header"], previous["tail"])
+
+    # ---------- restore ----------
+    # Function to find the snapshot with this id, or the latest one taken at or before `at`
+    def find(self, snapshot_id=None, at=None):
+        if snapshot_id is not None:
+            for snapshot in self.snapshots:
+                if snapshot["id"] == snapshot_id:
+                    return snapshot
+            raise KeyError(f"No snapshot '{snapshot_id}'")
+        at = time.time() if at is None else at
+        candidates = [s for s in self.snapshots if s["time"] <= at]
+        if not candidates:
+            raise KeyError(f"No snapshot at or before {datetime.fromtimestamp(at):%Y-%m-%d %H:%M:%S}")
+        return candidates[-1]
+
+    # Function to rebuild the file as of a snapshot by replaying its objects into `out`
+    def restore(self, out, snapshot_id=None, at=None):
+        snapshot = self.find(snapshot_id, at)
+        directory = os.path.dirname(os.path.abspath(out))
+        with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as tmp:
+            for digest in snapshot["objects"]:
+                with gzip.open(self._object_path(digest), "rb") as obj:
+                    while True:
+                        data = obj.read(COPY_CHUNK_BYTES)
+                        if not data:
+                            break
+                        tmp.write(data)
+        os.replace(tmp.name, out)
+        return snapshot
+
+    # ---------- retention ----------
+    # Function to get the snapshots the retention policy keeps: the newest snapshot
+    # in each of the most recent `count` hours/days/weeks, plus the latest snapshot
+    def retained(self, policy=None):
+        policy = DEFAULT_RETENTION if policy is None else policy
+        keep = {self.snapshots[-1]["id"]} if self.snapshots else set()
+        for name, count in policy.items():
+            buckets = {}
+            for snapshot in reversed(self.snapshots):
+                bucket = datetime.fromtimestamp(snapshot["time"]).strftime(RETENTION_BUCKETS[name])
+                if bucket not in buckets:
+                    if len(buckets) == count:
+                        break
+                    buckets[bucket] = snapshot["id"]
+            keep.update(buckets.values())
+        return [s for s in self.snapshots if s["id"] in keep]
+
+    # Function to drop snapshots outside the retention policy and delete unreferenced objects
+    def prune(self, policy=None):
+        kept = self.retained(policy)
+        removed = [s for s in self.snapshots if s not in kept]
+        self.snapshots = kept
+        self._write_manifest()
+        referenced = {digest for s in kept for digest in s["objects"]}
+        for path in glob.glob(os.path.join(self.objects_dir, "*", "*.gz")):
+            if os.path.basename(path)[:-3] not in referenced:
+                os.remove(path)
+        return removed
+
+    def disk_usage(self):
+        return sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.objects_dir, "*", "*.gz")))
+
+    # ---------- storage ----------
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.gz")
+
+    # Function to store `length` bytes read from `f` as a compressed object; returns its digest
+    def _put(self, f, length):
+        os.makedirs(self.objects_dir, exist_ok=True)
+        sha = hashlib.sha256()
+        with tempfile.NamedTemporaryFile("wb", dir=self.objects_dir, delete=False) as tmp:
+            with gzip.GzipFile(fileobj=tmp, mode="wb", mtime=0) as gz:
+                remaining = length
+                while remaining > 0:
+                    data = f.read(min(COPY_CHUNK_BYTES, remaining))
+                    if not data:
+                        break
+                    sha.update(data)
+                    gz.write(data)
+                    remaining -= len(data)
+        digest = sha.hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            os.remove(tmp.name)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp.name, path)
+        return digest
+
+    def _new_id(self, timestamp):
+        base = datetime.fromtimestamp(timestamp).strftime("%Y%m%d_%H%M%S")
+        ids = {s["id"] for s in self.snapshots}
+        snapshot_id, n = base, 1
+        while snapshot_id in ids:
+            snapshot_id = f"{base}_{n}"
+            n += 1
+        return snapshot_id
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path) as f:
+            return json.load(f)["snapshots"]
+
+    def _write_manifest(self):
+        os.makedirs(self.root, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=self.root, delete=False) as tmp:
+            json.dump({"snapshots": self.snapshots}, tmp, indent=1)
+        os.replace(tmp.name, self.manifest_path)
+
+
+# Function to parse a snapshot time given as YYYYmmdd_HHMMSS or ISO 8601
+def parse_time(value):
+    for fmt in ("%Y%m%d_%H%M%S", None):
+        try:
+            return (datetime.strptime(value, fmt) if fmt else datetime.fromisoformat(value)).timestamp()
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Invalid time '{value}'")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental, deduplicated backups of the sales dataset")
+    parser.add_argument("--dir", default=DEFAULT_BACKUP_DIR, help="snapshot store directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    snap = commands.add_parser("snapshot", help="snapshot the dataset (only new rows are stored)")
+    snap.add_argument("--file", default=DEFAULT_CSV)
+    snap.add_argument("--every", type=float, help="keep snapshotting every N seconds, pruning after each")
+    commands.add_parser("list", help="list snapshots")
+    restore = commands.add_parser("restore", help="restore the dataset as of a snapshot or point in time")
+    restore.add_argument("--out", default=DEFAULT_CSV)
+    restore.add_argument("--id", help="snapshot id")
+    restore.add_argument("--at", type=parse_time, help="time (YYYYmmdd_HHMMSS or ISO 8601); default: latest")
+    prune = commands.add_parser("prune", help="apply the retention policy")
+    for name, count in DEFAULT_RETENTION.items():
+        prune.add_argument(f"--{name}", type=int, default=count)
+    adopt = commands.add_parser("import", help="add full copies named backup_YYYYmmdd_HHMMSS.csv")
+    adopt.add_argument("files", nargs="+")
+    args = parser.parse_args(argv)
+
+    manager = BackupManager(args.dir)
+    if args.command == "snapshot":
+        while True:
+            snapshot = manager.snapshot(args.file)
+            print(f"{snapshot['id']}: {snapshot['size']} bytes in {len(snapshot['objects'])} objects, "
+                  f"store {manager.disk_usage()} bytes")
+            if args.every is None:
+                break
+            manager.prune()
+            time.sleep(args.every)
+    elif args.command == "list":
+        for s in manager.snapshots:
+            print(f"{s['id']}  {s['size']:>12} bytes  {len(s['objects'])} objects")
+        print(f"{len(manager.snapshots)} snapshots, store {manager.disk_usage()} bytes")
+    elif args.command == "restore":
+        snapshot = manager.restore(args.out, snapshot_id=args.id, at=args.at)
+        print(f"Restored {snapshot['id']} ({snapshot['size']} bytes) to {args.out}")
+    elif args.command == "prune":
+        removed = manager.prune({name: getattr(args, name) for name in DEFAULT_RETENTION})
+        print(f"Removed {len(removed)} snapshots, store {manager.disk_usage()} bytes")
+    else:
+        stamps = {}
+        for path in sorted(args.files):
+            match = BACKUP_NAME.fullmatch(os.path.basename(path))
+            if match is None:
+                parser.error(f"{path}: expected a file named backup_YYYYmmdd_HHMMSS.csv")
+            try:
+                stamps[path] = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+            except ValueError:
+                parser.error(f"{path}: invalid time in the file name")
+        for path, stamp in stamps.items():
+            snapshot = manager.add_copy(path, stamp)
+            print(f"{path} -> {snapshot['id']} ({len(snapshot['objects'])} objects)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
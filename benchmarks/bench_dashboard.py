@@ -0,0 +1,224 @@
+# Benchmark: the dashboard's hot paths (load, sidebar filters, cube, rollups and
+# sketches, per-tab KPIs and charts, approximate mode, CSV export, out-of-core
+# aggregation) at several dataset sizes, reported as JSON.
+#
+#   python benchmarks/bench_dashboard.py --rows 10000 100000 1000000 10000000 --output bench.json
+#   python benchmarks/bench_dashboard.py --rows 10000 100000 --baseline bench.json
+#
+# Datasets are generated once per (rows, seed) into --data-dir and reused. Each size
+# runs in its own process so peak RSS is measured per size and per stage.
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Generating_data import generate_dataset
+from data_loader import IncrementalCSVLoader
+from storage import open_store, import_csv
+from filters import FilterIndex, apply_filters
+from kpi_cube import KPICube
+from rollups import SalesRollups
+from sketches import SketchCube
+from kpis import sales_kpis, effectiveness_kpis, analysis_kpis
+from chart_data import sales_charts, effectiveness_charts, analysis_charts, sketch_rating_boxes, sketch_refund_boxes
+from export import export_to_file
+from query_engine import StoreAggregates
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+# Peak resident set size while a block runs, sampled from /proc/self/statm
+# (falls back to the process-wide ru_maxrss where /proc is unavailable)
+class PeakRSS:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    @staticmethod
+    def current():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            import resource
+            scale = 1 if sys.platform == "darwin" else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+# Function to run `fn` once and return its result and a result record for `stage`
+def measure(stage, rows, fn, *args):
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        value = fn(*args)
+        seconds = time.perf_counter() - start
+    return value, {"rows": rows, "stage": stage, "seconds": round(seconds, 6),
+                   "rows_per_sec": round(rows / seconds) if seconds > 0 else None,
+                   "peak_rss_mb": round(rss.peak / 2 ** 20, 1)}
+
+
+# Function to make (or reuse) the CSV dataset for `rows`
+def dataset_path(rows, seed, data_dir, workers):
+    path = os.path.join(data_dir, f"sales_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        tmp = f"{path}.tmp.csv"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        generate_dataset(rows, out=tmp, workers=workers, seed=seed)
+        os.replace(tmp, path)
+    return path
+
+
+# Function to pick a filter selection like a dashboard user's: the three most
+# common countries and products and one year
+def typical_filters(df):
+    countries = df["Country"].value_counts().index[:3].tolist()
+    products = df["Product Type"].value_counts().index[:3].tolist()
+    years = [int(df["Year"].dropna().mode().iloc[0])] if df["Year"].notna().any() else []
+    return countries, products, years
+
+
+# Function to answer the approximate-mode figures (customers, box plots, describe) for one selection
+def _approximate(sketches, cube_slice, selection):
+    sketch_slice = sketches.slice(*selection)
+    return (sketch_slice.customers(), sketch_rating_boxes(sketch_slice, cube_slice), sketch_refund_boxes(sketch_slice),
+            sketch_slice.describe())
+
+
+def _export(df):
+    with export_to_file(df, "csv") as f:
+        return f.seek(0, os.SEEK_END)
+
+
+# Function to run every stage on one dataset size; returns its result records
+def run_size(rows, seed, data_dir, workers, parquet):
+    results = []
+    path, record = measure("generate", rows, dataset_path, rows, seed, data_dir, workers)
+    results.append(record)
+    # Out of core first, while the process does not hold the loaded frame yet
+    _, record = measure("out_of_core_build", rows, lambda: StoreAggregates().sync(open_store(path)))
+    results.append(record)
+
+    df, record = measure("load_csv", rows, lambda: IncrementalCSVLoader(path).load())
+    results.append(record)
+    if parquet:
+        store_dir = os.path.join(data_dir, f"sales_{rows}_{seed}.parquet")
+        if not os.path.isdir(store_dir):
+            import_csv(path, open_store(store_dir))
+        _, record = measure("load_parquet", rows, open_store(store_dir).read)
+        results.append(record)
+
+    countries, products, years = typical_filters(df)
+    _, record = measure("filter_none", rows, apply_filters, df)
+    results.append(record)
+    filtered, record = measure("filter", rows, apply_filters, df, countries, products, years)
+    results.append(record)
+    index, record = measure("filter_index_build", rows, FilterIndex, df)
+    results.append(record)
+    _, record = measure("filter_indexed", rows, apply_filters, df, countries, products, years, index)
+    results.append(record)
+
+    cube, record = measure("cube_build", rows, KPICube.from_frame, df)
+    results.append(record)
+    rollups, record = measure("rollup_build", rows, SalesRollups.from_frame, df)
+    results.append(record)
+    sketches, record = measure("sketch_build", rows, SketchCube.from_frame, df)
+    results.append(record)
+    for name, frame, selection in (("all", df, ([], [], [])), ("filtered", filtered, (countries, products, years))):
+        cube_slice = cube.slice(*selection)
+        rollup_slice = rollups.slice(*selection)
+        for tab, fn in (("sales", lambda: (sales_kpis(frame, cube_slice), sales_charts(frame, cube_slice))),
+                        ("effectiveness", lambda: (effectiveness_kpis(frame, cube_slice), effectiveness_charts(frame))),
+                        ("analysis", lambda: (analysis_kpis(frame, cube_slice), analysis_charts(frame, rollup_slice)))):
+            _, record = measure(f"tab_{tab}_{name}", rows, fn)
+            results.append(record)
+        _, record = measure(f"approximate_{name}", rows, _approximate, sketches, cube_slice, selection)
+        results.append(record)
+
+    size, record = measure("export_csv", rows, _export, df)
+    record["bytes"] = size
+    results.append(record)
+    return results
+
+
+# Function to compare seconds per (rows, stage) with a previous report; returns the regressions
+def compare(results, baseline, tolerance):
+    before = {(r["rows"], r["stage"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = before.get((r["rows"], r["stage"]))
+        if old is None or r["stage"] == "generate" or old <= 0:
+            continue
+        r["baseline_seconds"] = old
+        r["change"] = round(r["seconds"] / old - 1, 3)
+        if r["change"] > tolerance:
+            regressions.append(r)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the dashboard hot paths at several dataset sizes")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where generated datasets are kept")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for generation")
+    parser.add_argument("--parquet", action="store_true", help="also time loading from a Parquet store")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown (fraction) reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.rows:
+        # A fresh process per size keeps peak RSS from leaking between sizes
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results += pool.submit(run_size, rows, args.seed, args.data_dir, args.workers, args.parquet).result()
+
+    report = {"meta": {"python": platform.python_version(), "pandas": pd.__version__, "platform": platform.platform(),
+                       "cpus": os.cpu_count(), "seed": args.seed},
+              "results": results}
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for r in regressions:
+        print(f"REGRESSION {r['stage']} @ {r['rows']} rows: {r['baseline_seconds']:.4f}s -> {r['seconds']:.4f}s "
+              f"({r['change']:+.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+# Benchmark: rows/sec of the per-row create_record() path vs generate_records()
+#
+#   python benchmarks/bench_generation.py --rows 2000 100000 1000000
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Generating_data import create_record, generate_records, columns
+
+
+# Function to time the current path: one dict per row, then a DataFrame
+def run_per_row(n):
+    start = time.perf_counter()
+    pd.DataFrame([create_record() for _ in range(n)], columns=columns)
+    return time.perf_counter() - start
+
+
+# Function to time the vectorized batch path
+def run_batch(n, seed):
+    start = time.perf_counter()
+    generate_records(n, seed=seed)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare record generation throughput")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--per-row-limit", type=int, default=10000,
+                        help="largest row count to run through create_record() (it is slow)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'create_record rows/s':>22} {'generate_records rows/s':>24} {'speedup':>8}")
+    for n in args.rows:
+        batch = run_batch(n, args.seed)
+        if n <= args.per_row_limit:
+            per_row = run_per_row(n)
+            print(f"{n:>10} {n / per_row:>22,.0f} {n / batch:>24,.0f} {per_row / batch:>7.1f}x")
+        else:
+            print(f"{n:>10} {'-':>22} {n / batch:>24,.0f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from kpi_cube import CubeSlice, aggregate
+from rollups import SalesRollups
+
+# Most points a time series sends to the browser, however many days it covers
+MAX_SERIES_POINTS = 1000
+RESPONSE_TIME_BINS = 10
+
+
+# Plot-ready data for every chart that would otherwise be drawn from raw rows.
+# Each table is bounded by the number of categories, bins or MAX_SERIES_POINTS,
+# so the browser payload does not grow with the dataset.
+@dataclass
+class ChartData:
+    # Sales tab
+    loss_by_product: pd.DataFrame
+    sales_by_customer_type: pd.DataFrame
+
+    # Effectiveness tab
+    rating_boxes: pd.DataFrame
+    refund_boxes: pd.DataFrame
+    response_time_bins: pd.DataFrame
+
+    # Analysis tab
+    daily_sales: pd.DataFrame
+    monthly_sales: pd.DataFrame
+    yearly_sales: pd.DataFrame
+
+
+# Function to downsample a series to at most `threshold` points with
+# Largest-Triangle-Three-Buckets: the first and last points are kept and each
+# bucket in between keeps the point forming the largest triangle with the point
+# kept before it and the average of the next bucket, which preserves peaks and dips.
+def lttb(x, y, threshold=MAX_SERIES_POINTS):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+# Function to downsample a (x, y) frame sorted by x to at most `threshold` rows
+def downsample(frame, x, y, threshold=MAX_SERIES_POINTS):
+    xs = frame[x]
+    if pd.api.types.is_datetime64_any_dtype(xs):
+        xs = xs.astype("int64")
+    return frame.iloc[lttb(xs, frame[y], threshold)].reset_index(drop=True)
+
+
+# Function to get box-plot statistics of `value` per `group`: quartiles and
+# Tukey whiskers (the most extreme values within 1.5 IQR of the box), as drawn by
+# plotly's go.Box from precomputed q1/median/q3/lowerfence/upperfence
+def box_stats(df, group, value):
+    frame = pd.DataFrame({group: df[group], value: pd.to_numeric(df[value], errors="coerce")}).dropna()
+    if frame.empty:
+        return pd.DataFrame(columns=[group, "q1", "median", "q3", "lowerfence", "upperfence", "count"])
+    grouped = frame.groupby(group, observed=True)[value]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "median", "q3"]
+    iqr = stats["q3"] - stats["q1"]
+    low = frame[group].map(stats["q1"] - 1.5 * iqr).astype(float)
+    high = frame[group].map(stats["q3"] + 1.5 * iqr).astype(float)
+    inside = frame[value].between(low, high)
+    whiskers = frame[inside].groupby(group, observed=True)[value].agg(["min", "max"])
+    stats["lowerfence"] = whiskers["min"]
+    stats["upperfence"] = whiskers["max"]
+    stats["count"] = grouped.size()
+    return stats.reset_index()
+
+
+# Function to count `values` (each occurring `weights` times, once by default) in
+# `bins` equal-width bins; returns bin start, end and count
+def histogram_bins(values, bins, weights=None):
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    present = ~np.isnan(values)
+    if weights is not None:
+        weights = np.asarray(weights)[present]
+    values = values[present]
+    if len(values) == 0:
+        return pd.DataFrame({"Start": [], "End": [], "Count": []})
+    counts, edges = np.histogram(values, bins=bins, weights=weights)
+    return pd.DataFrame({"Start": edges[:-1], "End": edges[1:], "Count": counts})
+
+
+# ----------------- PER-CHART DATA -----------------
+def loss_by_product(cube_slice):
+    return cube_slice.by("Product Type", ["Loss"]).sort_values("Loss", ascending=False).reset_index()
+
+
+def sales_by_customer_type(cube_slice):
+    return cube_slice.by("Customer Type", ["Sales Amount"]).reset_index()
+
+
+# Ratings of the five most sold products; unrated sales count as a rating of 0
+def rating_boxes(df):
+    top_selling = df["Product Type"].value_counts().nlargest(5).index
+    rated = df[df["Product Type"].isin(top_selling)]
+    return box_stats(rated.assign(**{"Product Rating": rated["Product Rating"].fillna(0)}),
+                     "Product Type", "Product Rating")
+
+
+def refund_boxes(df):
+    return box_stats(df[df["Refund Amount"] > 0], "Product Type", "Refund Amount")
+
+
+def response_time_bins(df):
+    return histogram_bins(df["Response Time (days)"], RESPONSE_TIME_BINS)
+
+
+# Same bins from a count per response time (the out-of-core engine's counts)
+def response_time_count_bins(counts):
+    return histogram_bins(counts.index, RESPONSE_TIME_BINS, weights=counts.to_numpy())
+
+
+# Completed sales revenue per day, month and year from the rollups, the long series
+# downsampled to `max_points`
+def sales_over_time(rollup_slice, max_points=MAX_SERIES_POINTS):
+    def completed_sales(freq, period):
+        series = rollup_slice.series(freq, ["Revenue", "Completed"])
+        series = series[series["Completed"] > 0].rename(columns={"Revenue": "Sales Amount"})
+        return series.rename_axis(period)[["Sales Amount"]].reset_index()
+
+    return dict(
+        daily_sales=downsample(completed_sales("daily", "Day"), "Day", "Sales Amount", max_points),
+        monthly_sales=downsample(completed_sales("monthly", "Month"), "Month", "Sales Amount", max_points),
+        yearly_sales=completed_sales("yearly", "Year"),
+    )
+
+
+# Box plots from merged sketches, for the approximate analytics mode: quartiles and
+# whiskers are within sketches.QUANTILE_ACCURACY of the exact ones
+def sketch_rating_boxes(sketch_slice, cube_slice):
+    top_selling = cube_slice.by("Product Type")["Rows"].nlargest(5).index
+    return sketch_slice.box_stats("Product Rating", groups=top_selling, missing_as_zero=True)
+
+
+def sketch_refund_boxes(sketch_slice):
+    return sketch_slice.box_stats("Refund Amount", positive_only=True)
+
+
+# ----------------- PER-TAB DATA -----------------
+# Function to compute the Sales tab plot data (ChartData fields); both are cube sums
+def sales_charts(df, cube_slice=None):
+    cube_slice = CubeSlice(*aggregate(df)) if cube_slice is None else cube_slice
+    return dict(loss_by_product=loss_by_product(cube_slice), sales_by_customer_type=sales_by_customer_type(cube_slice))
+
+
+# Function to compute the Effectiveness tab plot data (ChartData fields) from the raw rows
+def effectiveness_charts(df):
+    return dict(rating_boxes=rating_boxes(df), refund_boxes=refund_boxes(df), response_time_bins=response_time_bins(df))
+
+
+# Function to compute the Analysis tab plot data (ChartData fields) from the rollups
+def analysis_charts(df, rollup_slice=None, max_points=MAX_SERIES_POINTS):
+    rollup_slice = SalesRollups.from_frame(df).slice() if rollup_slice is None else rollup_slice
+    return sales_over_time(rollup_slice, max_points)
+
+
+# Function to compute the plot data of all tabs for `df` (sliced from `cube_slice` and
+# `rollup_slice` where they have the measure, from the raw rows otherwise)
+def compute_chart_data(df, cube_slice=None, max_points=MAX_SERIES_POINTS, rollup_slice=None):
+    if cube_slice is None:
+        cube_slice = CubeSlice(*aggregate(df))
+    return ChartData(**sales_charts(df, cube_slice), **effectiveness_charts(df),
+                     **analysis_charts(df, rollup_slice, max_points))
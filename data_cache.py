@@ -0,0 +1,136 @@
+import os
+import sys
+import glob
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = int(os.environ.get("SALES_CACHE_MAX_MB", 1024)) * 1024 * 1024
+
+
+# Function to fingerprint a data file or store directory: changes whenever data is written
+def file_fingerprint(path):
+    if os.path.isdir(path):
+        stats = [os.stat(p) for p in glob.glob(os.path.join(path, "**", "*.parquet"), recursive=True)]
+        return (len(stats), sum(s.st_size for s in stats), max((s.st_mtime_ns for s in stats), default=0))
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+# Function to estimate how much memory a cached value holds
+def estimate_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if hasattr(value, "__dict__"):
+        return sum(estimate_size(v) for v in vars(value).values())
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    def __init__(self, version, value, size):
+        self.version = version
+        self.value = value
+        self.size = size
+
+
+# Process-wide, size-bounded LRU cache shared by every dashboard session.
+# Each entry is stored with the data version it was built from (a file fingerprint
+# or ingestion sequence number); asking for a newer version rebuilds it once,
+# however many sessions ask at the same time. Values are shared between sessions
+# and must be treated as read-only.
+class DataCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._key_locks = {}  # key: [lock, number of threads holding or waiting for it]
+        self._lock = threading.Lock()
+
+    # `build(previous)` gets the stale value (or None) so incremental structures can be updated in place
+    def get(self, key, version, build):
+        entry = self._lookup(key, version)
+        if entry is not None:
+            return entry.value
+        with self._key_lock(key):
+            # Another session may have rebuilt it while this one waited
+            entry = self._lookup(key, version, count=False)
+            if entry is not None:
+                return entry.value
+            with self._lock:
+                previous = self._entries.get(key)
+            value = build(previous.value if previous is not None else None)
+            self._store(key, _Entry(version, value, estimate_size(value)))
+            return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.total_bytes = 0
+            elif key in self._entries:
+                self.total_bytes -= self._entries.pop(key).size
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.total_bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+    def _lookup(self, key, version, count=True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return entry
+            if count:
+                self.misses += 1
+            return None
+
+    # Context manager holding the build lock of one key. The lock is dropped once no
+    # thread holds or waits for it, so a builder never ends up with a lock another
+    # thread has already replaced.
+    @contextmanager
+    def _key_lock(self, key):
+        with self._lock:
+            slot = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if slot[1] == 0:
+                    del self._key_locks[key]
+
+    def _store(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.size
+            self._entries[key] = entry
+            self.total_bytes += entry.size
+            # Evict least recently used entries, never the one just stored
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.size
+
+
+# The cache shared by all sessions of this process
+shared_cache = DataCache()
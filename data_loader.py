@@ -0,0 +1,215 @@
+import os
+import threading
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from schema import apply_schema, csv_dtypes
+
+
+# Function to read CSV data (a path or a binary buffer) keeping the text columns as
+# text; `renames` is passed to csv_dtypes, other arguments to pd.read_csv
+def read_csv(source, renames=None, **kwargs):
+    header = pd.read_csv(source, nrows=0).columns
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return pd.read_csv(source, dtype=csv_dtypes(header, renames), on_bad_lines='skip', **kwargs)
+
+
+# Function to read a CSV payload (header line + rows) into a typed DataFrame
+def parse_csv_bytes(payload):
+    df = read_csv(BytesIO(payload))
+    df.columns = df.columns.str.strip()  # Clean column names
+    return apply_schema(df)
+
+
+# ----------------- APPENDABLE FRAME -----------------
+# Column storage for a DataFrame that only grows at the end. Rows are written into
+# arrays with spare capacity (doubled when full) and frame() wraps the filled part
+# without copying, so an append costs O(new rows) instead of copying all N rows.
+class _NumpyColumn:
+    def __init__(self, values):
+        self.values = np.empty(0, dtype=values.dtype)
+
+    def grow(self, capacity, rows):
+        values = np.empty(capacity, dtype=self.values.dtype)
+        values[:rows] = self.values[:rows]
+        self.values = values
+
+    def put(self, start, array):
+        self.values[start:start + len(array)] = array.to_numpy()
+
+    def array(self, rows):
+        return self.values[:rows]
+
+
+# Nullable Int8/Int16/boolean columns: values and mask kept side by side
+class _MaskedColumn:
+    def __init__(self, array):
+        self.kind = type(array)
+        self.values = np.empty(0, dtype=array.dtype.numpy_dtype)
+        self.mask = np.empty(0, dtype=bool)
+
+    def grow(self, capacity, rows):
+        values, mask = np.empty(capacity, dtype=self.values.dtype), np.empty(capacity, dtype=bool)
+        values[:rows], mask[:rows] = self.values[:rows], self.mask[:rows]
+        self.values, self.mask = values, mask
+
+    def put(self, start, array):
+        stop = start + len(array)
+        self.values[start:stop] = array.to_numpy(dtype=self.values.dtype, na_value=0)
+        self.mask[start:stop] = array.isna()
+
+    def array(self, rows):
+        return self.kind(self.values[:rows], self.mask[:rows])
+
+
+# Categories new to an appended chunk go after the existing ones (as concat_frames
+# does), so the codes already written stay valid
+class _CategoricalColumn:
+    def __init__(self, array):
+        self.categories = array.categories[:0]
+        self.ordered = array.ordered
+        self.codes = np.empty(0, dtype=np.int8)
+
+    def grow(self, capacity, rows):
+        codes = np.empty(capacity, dtype=self.codes.dtype)
+        codes[:rows] = self.codes[:rows]
+        self.codes = codes
+
+    def put(self, start, array):
+        if not array.categories.equals(self.categories):
+            self.categories = self.categories.append(array.categories.difference(self.categories, sort=False))
+            # Codes are stored in the width pandas picks for this many categories
+            dtype = pd.Categorical.from_codes([], self.categories).codes.dtype
+            if dtype != self.codes.dtype:
+                self.codes = self.codes.astype(dtype)
+        codes = self.categories.get_indexer(array.categories)[array.codes]
+        self.codes[start:start + len(array)] = np.where(array.codes < 0, -1, codes)
+
+    def array(self, rows):
+        return pd.Categorical.from_codes(self.codes[:rows], self.categories, ordered=self.ordered, validate=False)
+
+
+# Arrow columns (text, UUIDs) are chunked: an append adds a chunk, merging the
+# trailing chunks while they are no bigger than the new one to keep the count low
+class _ArrowColumn:
+    def __init__(self, array):
+        self.kind = type(array)
+        self.type = None
+        self.chunks = []
+
+    def grow(self, capacity, rows):
+        pass
+
+    def put(self, start, array):
+        chunk = pa.array(array)
+        if isinstance(chunk, pa.ChunkedArray):
+            chunk = chunk.combine_chunks()
+        self.type = self.type or chunk.type
+        self.chunks.append(chunk.cast(self.type))
+        while len(self.chunks) > 1 and len(self.chunks[-2]) <= len(self.chunks[-1]):
+            last = self.chunks.pop()
+            self.chunks[-1] = pa.concat_arrays([self.chunks[-1], last])
+
+    def array(self, rows):
+        return self.kind(pa.chunked_array(self.chunks, type=self.type))
+
+
+# Any other column falls back to concatenating
+class _ConcatColumn:
+    def __init__(self, array):
+        self.values = pd.Series(array[:0])
+
+    def grow(self, capacity, rows):
+        pass
+
+    def put(self, start, array):
+        self.values = pd.concat([self.values, pd.Series(array)], ignore_index=True)
+
+    def array(self, rows):
+        return self.values.array
+
+
+def _column_storage(values):
+    array = values.array
+    if isinstance(array, pd.Categorical):
+        return _CategoricalColumn(array)
+    if isinstance(array, pd.arrays.ArrowExtensionArray):
+        return _ArrowColumn(array)
+    if isinstance(array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+        return _MaskedColumn(array)
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "biufmM":
+        return _NumpyColumn(values)
+    return _ConcatColumn(array)
+
+
+class AppendableFrame:
+    def __init__(self, df):
+        self.rows = 0
+        self.capacity = 0
+        self.columns = {col: _column_storage(df[col]) for col in df.columns}
+        self.append(df)
+
+    def append(self, df):
+        if self.rows + len(df) > self.capacity:
+            self.capacity = max(self.rows + len(df), 2 * self.capacity)
+            for column in self.columns.values():
+                column.grow(self.capacity, self.rows)
+        for col, column in self.columns.items():
+            column.put(self.rows, df[col].array)
+        self.rows += len(df)
+
+    def frame(self):
+        return pd.DataFrame({col: pd.Series(column.array(self.rows), copy=False)
+                             for col, column in self.columns.items()}, copy=False)
+
+
+# Incremental loader for an append-only CSV file.
+# Remembers the byte offset and DataFrame from the last read so a refresh only
+# parses the lines appended since then; they are added to an AppendableFrame,
+# so rows already loaded are not copied again. The whole file is re-read when it shrinks
+# (truncated or replaced) or when its header line changes.
+class IncrementalCSVLoader:
+    def __init__(self, path):
+        self.path = path
+        self.header = None
+        self.offset = 0
+        self.df = None
+        self._rows = None
+        self.full_reloads = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            size = os.path.getsize(self.path)
+            with open(self.path, 'rb') as f:
+                header = f.readline()
+                if self.df is None or size < self.offset or header != self.header:
+                    f.seek(0)
+                    self._full_reload(f.read(), header)
+                elif size > self.offset:
+                    f.seek(self.offset)
+                    self._append(f.read(size - self.offset))
+            return self.df
+
+    def _full_reload(self, data, header):
+        # Only consume complete lines; a half-written last row is picked up next time
+        end = data.rfind(b'\n') + 1
+        self.header = header
+        self._rows = AppendableFrame(parse_csv_bytes(data[:end]))
+        self.df = self._rows.frame()
+        self.offset = end
+        self.full_reloads += 1
+
+    def _append(self, data):
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return
+        new_rows = parse_csv_bytes(self.header + data[:end])
+        if len(new_rows):
+            self._rows.append(new_rows)
+            self.df = self._rows.frame()
+        self.offset += end
@@ -0,0 +1,159 @@
+import io
+import zlib
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from schema import DERIVED_COLUMNS, decode_columns
+
+# Rows serialized per step; peak memory is one chunk plus the writer's buffers
+DEFAULT_CHUNK_ROWS = 50_000
+# Excel sheets hold at most 1,048,576 rows including the header
+XLSX_MAX_ROWS = 1_048_575
+# Exports up to this size stay in memory, larger ones spill to a temporary file
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+FORMATS = {
+    "csv": {"label": "CSV", "extension": "csv", "mime": "text/csv"},
+    "csv.gz": {"label": "CSV (gzip)", "extension": "csv.gz", "mime": "application/gzip"},
+    "parquet": {"label": "Parquet", "extension": "parquet", "mime": "application/vnd.apache.parquet"},
+    "xlsx": {"label": "Excel", "extension": "xlsx",
+             "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+}
+
+
+# File-like sink that hands written bytes back to a generator instead of keeping them
+class _ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+# Function to split a frame into row chunks in the source layout: encoded columns are
+# decoded to text and the derived Year/Month/Day columns the loader adds are dropped.
+# `df` may also be an iterable of frames (e.g. a store scanned out of core), taken as
+# its chunks; it should yield at least one, possibly empty, frame.
+def _chunks(df, chunk_rows):
+    frames = df
+    if isinstance(df, pd.DataFrame):
+        frames = (df.iloc[start:start + chunk_rows] for start in range(0, max(len(df), 1), chunk_rows))
+    for number, chunk in enumerate(frames):
+        yield number, decode_columns(chunk.drop(columns=[c for c in DERIVED_COLUMNS if c in chunk.columns]))
+
+
+# Function to get the Parquet schema of a decoded chunk. Dictionary (categorical)
+# columns get 32-bit indices, as chunks of a scan each have their own categories.
+def _parquet_schema(chunk):
+    schema = pa.Schema.from_pandas(chunk.iloc[:0], preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_dictionary(field.type):
+            schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), field.type.value_type)))
+    return schema
+
+
+def _iter_csv(df, chunk_rows):
+    for number, chunk in _chunks(df, chunk_rows):
+        yield chunk.to_csv(index=False, header=number == 0).encode("utf-8")
+
+
+def _iter_csv_gzip(df, chunk_rows):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for data in _iter_csv(df, chunk_rows):
+        out = compressor.compress(data)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _iter_parquet(df, chunk_rows):
+    sink = _ChunkSink()
+    writer = None
+    for _, chunk in _chunks(df, chunk_rows):
+        if writer is None:
+            schema = _parquet_schema(chunk)
+            writer = pq.ParquetWriter(sink, schema)
+        # Each chunk's dictionaries only hold the categories it uses, not the whole frame's
+        chunk = chunk.assign(**{c: chunk[c].cat.remove_unused_categories() for c in chunk.columns
+                                if isinstance(chunk[c].dtype, pd.CategoricalDtype)})
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        data = sink.drain()
+        if data:
+            yield data
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+def _xlsx_value(value):
+    # openpyxl cannot write pandas NA/NaT or numpy scalars
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def _iter_xlsx(df, chunk_rows):
+    # Write-only workbooks stream rows to disk instead of building the sheet in memory
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_rows = XLSX_MAX_ROWS
+    columns = []
+    for _, chunk in _chunks(df, chunk_rows):
+        columns = list(chunk.columns)
+        for row in chunk.astype(object).itertuples(index=False, name=None):
+            if sheet_rows >= XLSX_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Data {len(workbook.worksheets) + 1}")
+                sheet.append(columns)
+                sheet_rows = 0
+            sheet.append([_xlsx_value(v) for v in row])
+            sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet("Data 1").append(columns)
+    with tempfile.TemporaryFile() as f:
+        workbook.save(f)
+        f.seek(0)
+        while True:
+            data = f.read(1024 * 1024)
+            if not data:
+                break
+            yield data
+
+
+_WRITERS = {"csv": _iter_csv, "csv.gz": _iter_csv_gzip, "parquet": _iter_parquet, "xlsx": _iter_xlsx}
+
+
+# Function to serialize `df` (a frame or an iterable of frames) in `fmt` as a stream of byte chunks
+def iter_export(df, fmt="csv", chunk_rows=DEFAULT_CHUNK_ROWS):
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unsupported export format '{fmt}'")
+    for data in _WRITERS[fmt](df, chunk_rows):
+        if data:
+            yield data
+
+
+# Function to write an export into a (spooled) temporary file and return it rewound,
+# ready to hand to st.download_button
+def export_to_file(df, fmt="csv", chunk_rows=DEFAULT_CHUNK_ROWS):
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    for data in iter_export(df, fmt, chunk_rows):
+        f.write(data)
+    f.seek(0)
+    return f
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+
+# Function to get the boolean row mask of the sidebar filters (empty selections match everything)
+def filter_mask(df, countries=None, products=None, years=None):
+    mask = np.ones(len(df), dtype=bool)
+    if countries:
+        mask &= df['Country'].isin(countries).to_numpy()
+    if products:
+        mask &= df['Product Type'].isin(products).to_numpy()
+    if years:
+        mask &= df['Year'].isin(years).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+# Function to get the rows of `df` matching the sidebar filters. With no selection
+# `df` itself is returned (treat it as read-only); with a FilterIndex of `df` the rows
+# are looked up instead of scanned.
+def apply_filters(df, countries=None, products=None, years=None, index=None):
+    if not (countries or products or years):
+        return df
+    if index is not None:
+        return df.iloc[index.rows(countries, products, years)]
+    return df[filter_mask(df, countries, products, years)]
+
+
+# Inverted index over the filterable columns: for every value, the sorted ids of the
+# rows holding it (one stable argsort of the value codes per column, sliced per value).
+# rows() starts from the most selective selection and checks the other columns with a
+# per-row code lookup on those candidates only, so selective queries cost
+# O(matching rows), not O(rows), and the base frame is never copied.
+class FilterIndex:
+    COLUMNS = {"countries": "Country", "products": "Product Type", "years": "Year"}
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self._columns = {}
+        for name, column in self.COLUMNS.items():
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, uniques = pd.factorize(values)
+            codes = np.asarray(codes, dtype=np.int32)
+            order = np.argsort(codes, kind="stable")
+            # Rows with a missing value (code -1) sort first and are skipped by the offsets
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            offsets = np.concatenate([[0], np.cumsum(counts)]) + (codes < 0).sum()
+            lookup = {_key(v): i for i, v in enumerate(uniques)}
+            self._columns[name] = (codes, order, offsets, lookup)
+
+    # Function to get the sorted row ids of one value of a filter column
+    def postings(self, name, value):
+        codes, order, offsets, lookup = self._columns[name]
+        code = lookup.get(_key(value))
+        if code is None:
+            return order[:0]
+        return order[offsets[code]:offsets[code + 1]]
+
+    # Function to get the sorted ids of the rows matching every non-empty selection,
+    # or None when nothing is selected (every row matches)
+    def rows(self, countries=None, products=None, years=None):
+        selections = {name: values for name, values in
+                      (("countries", countries), ("products", products), ("years", years)) if values}
+        if not selections:
+            return None
+        codes_selected = {name: self._selected_codes(name, values) for name, values in selections.items()}
+        sizes = {name: self._size(name, codes) for name, codes in codes_selected.items()}
+        first = min(sizes, key=sizes.get)
+
+        _, order, offsets, _ = self._columns[first]
+        parts = [order[offsets[c]:offsets[c + 1]] for c in codes_selected[first]]
+        rows = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts)) if parts else order[:0]
+        for name, codes in codes_selected.items():
+            if name == first or len(rows) == 0:
+                continue
+            column_codes, _, offsets, _ = self._columns[name]
+            allowed = np.zeros(len(offsets), dtype=bool)  # one slot per value plus the NA slot (-1)
+            allowed[codes] = True
+            rows = rows[allowed[column_codes[rows]]]
+        return rows
+
+    def _selected_codes(self, name, values):
+        lookup = self._columns[name][3]
+        return np.array(sorted({lookup[_key(v)] for v in values if _key(v) in lookup}), dtype=np.int64)
+
+    def _size(self, name, codes):
+        offsets = self._columns[name][2]
+        return int((offsets[codes + 1] - offsets[codes]).sum())
+
+
+# Values are looked up by their plain Python form, so 2024, np.int16(2024) and "2024" differ
+# only where the column type does
+def _key(value):
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,157 @@
+import os
+import time
+import queue
+import argparse
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from Generating_data import create_record, generate_records, columns, DEFAULT_CSV
+from schema import concat_frames
+from storage import open_store
+from instrumentation import timed
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# Batches above this size are drawn with the vectorized generator
+BULK_THRESHOLD = 50
+# A Parquet month partition is compacted into one file once a flush leaves it with more files than this
+COMPACT_AFTER_FILES = 32
+
+_process_locks = {}
+_process_locks_guard = threading.Lock()
+
+
+# Context manager holding an exclusive lock on `<path>.lock`, so concurrent
+# writers (several dashboard processes, the CLI) never interleave appends
+@contextmanager
+def store_lock(path):
+    with _process_locks_guard:
+        thread_lock = _process_locks.setdefault(os.path.abspath(path), threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path.rstrip(os.sep)}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Function to make `n` new records: one create_record() each for small batches,
+# generate_records() for large ones
+def make_records(n):
+    if n >= BULK_THRESHOLD:
+        return generate_records(n)
+    return pd.DataFrame([create_record() for _ in range(n)], columns=columns)
+
+
+# Background ingestion: a producer thread makes records at `rate` records per second
+# and puts them on a queue; a single writer thread drains the queue every
+# `flush_interval` seconds and appends the batch to the store under store_lock().
+# Every flush adds a file to a Parquet store, so the writer compacts partitions that
+# pass `compact_after` files. Other code can hand records to the writer with submit().
+class IngestionWorker:
+    def __init__(self, store, rate=1 / 60, flush_interval=5.0, compact_after=COMPACT_AFTER_FILES):
+        self.store = store
+        self.rate = rate
+        self.flush_interval = flush_interval
+        self.compact_after = compact_after
+        self.records_written = 0
+        self.batches_written = 0
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def path(self):
+        return getattr(self.store, "path", None) or self.store.root
+
+    def start(self):
+        self.ensure_exists()
+        self._threads = [threading.Thread(target=self._produce, name="ingest-producer", daemon=True),
+                         threading.Thread(target=self._write, name="ingest-writer", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, df):
+        self._queue.put(df)
+
+    def ensure_exists(self):
+        # Readers need a file with a header before the first batch is due
+        with store_lock(self.path):
+            if not self.store.exists():
+                self.store.append(make_records(1))
+                self.records_written += 1
+
+    def _produce(self):
+        due = 0.0
+        last = time.monotonic()
+        while not self._stop.wait(min(self.flush_interval, 1 / self.rate if self.rate > 0 else self.flush_interval)):
+            now = time.monotonic()
+            due += (now - last) * self.rate
+            last = now
+            n = int(due)
+            if n:
+                due -= n
+                self._queue.put(make_records(n))
+
+    def _write(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        batch = concat_frames(batch)
+        if batch is None or batch.empty:
+            return 0
+        with timed("ingest.append", rows=len(batch)), store_lock(self.path):
+            self.store.append(batch)
+        if hasattr(self.store, "compact"):
+            with timed("ingest.compact"), store_lock(self.path):
+                self.store.compact(min_files=self.compact_after + 1)
+        self.records_written += len(batch)
+        self.batches_written += 1
+        return len(batch)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Continuously append synthetic records to the sales dataset")
+    parser.add_argument("--out", default=DEFAULT_CSV, help="CSV file or Parquet store directory")
+    parser.add_argument("--per-minute", type=float, default=1.0, help="records produced per minute")
+    parser.add_argument("--flush-interval", type=float, default=5.0, help="seconds between batch writes")
+    args = parser.parse_args(argv)
+
+    worker = IngestionWorker(open_store(args.out), rate=args.per_minute / 60,
+                             flush_interval=args.flush_interval).start()
+    print(f"Ingesting {args.per_minute:g} records/minute into {args.out} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"{worker.records_written} records in {worker.batches_written} batches")
+    except KeyboardInterrupt:
+        worker.stop()
+        print(f"Stopped after {worker.records_written} records")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,202 @@
+import io
+import os
+import json
+import math
+import time
+import logging
+import bisect
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import pyinstrument
+except ImportError:  # optional: cProfile is always available
+    pyinstrument = None
+
+# Upper bounds (seconds) of the latency histogram buckets exported as metrics
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Latencies kept per stage for percentiles and the admin panel histograms
+RECENT_SAMPLES = 500
+
+logger = logging.getLogger("sales.timing")
+# SALES_TIMING_LOG=<path> writes one JSON object per timed stage to that file
+if os.environ.get("SALES_TIMING_LOG") and not logger.handlers:
+    _handler = logging.FileHandler(os.environ["SALES_TIMING_LOG"])
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_current_run = contextvars.ContextVar("sales_timing_run", default=None)
+
+
+class _Stage:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+
+# Process-wide latency registry shared by every dashboard session (and the API).
+# Keeps running totals and histogram bucket counts per stage since start-up, plus
+# the last RECENT_SAMPLES latencies for percentiles.
+class Timings:
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            s = self._stages.setdefault(stage, _Stage())
+            s.count += 1
+            s.total += seconds
+            s.max = max(s.max, seconds)
+            s.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+            s.recent.append(seconds)
+
+    def samples(self, stage):
+        with self._lock:
+            s = self._stages.get(stage)
+            return list(s.recent) if s else []
+
+    def summary(self):
+        rows = []
+        with self._lock:
+            items = [(name, s.count, s.total, s.max, sorted(s.recent)) for name, s in self._stages.items()]
+        for name, count, total, maximum, recent in sorted(items):
+            rows.append({"stage": name, "count": count, "mean_ms": total / count * 1000,
+                         "p50_ms": _percentile(recent, 0.5) * 1000, "p95_ms": _percentile(recent, 0.95) * 1000,
+                         "max_ms": maximum * 1000, "last_ms": recent[-1] * 1000 if recent else None})
+        return rows
+
+    # Function to render the registry in the Prometheus text exposition format
+    def metrics_text(self, prefix="sales_stage_seconds"):
+        lines = [f"# HELP {prefix} Time spent per dashboard/API stage", f"# TYPE {prefix} histogram"]
+        with self._lock:
+            for name, s in sorted(self._stages.items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (float("inf"),), s.buckets):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{prefix}_bucket{{stage="{label}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_sum{{stage="{label}"}} {s.total}')
+                lines.append(f'{prefix}_count{{stage="{label}"}} {s.count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return float("nan")
+    # Nearest-rank percentile
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+# The registry shared by all sessions of this process
+timings = Timings()
+
+
+# Function to start collecting the stages of one script run (or request)
+def start_run(**fields):
+    run = {"fields": fields, "stages": [], "start": time.perf_counter()}
+    _current_run.set(run)
+    return run
+
+
+# Function to close the current run; records its total time as stage `name`
+def finish_run(name="run"):
+    run = _current_run.get()
+    if run is None:
+        return None
+    _record(name, time.perf_counter() - run["start"], run)
+    _current_run.set(None)
+    return run
+
+
+# Context manager timing a block as `stage`: the latency goes to the shared registry,
+# the current run's breakdown and, if enabled, the JSON timing log
+@contextmanager
+def timed(stage, **fields):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage, time.perf_counter() - start, _current_run.get(), fields)
+
+
+# Function to record a latency measured elsewhere (e.g. by a request middleware)
+def observe(stage, seconds, **fields):
+    _record(stage, seconds, _current_run.get(), fields)
+
+
+def _record(stage, seconds, run, fields=None):
+    timings.observe(stage, seconds)
+    if run is not None:
+        run["stages"].append((stage, seconds))
+    if logger.isEnabledFor(logging.INFO):
+        event = {"ts": time.time(), "stage": stage, "ms": round(seconds * 1000, 3), "thread": threading.get_ident()}
+        if run is not None:
+            event.update(run["fields"])
+        event.update(fields or {})
+        logger.info(json.dumps(event, default=str))
+
+
+# Profiler wrapper: cProfile, or pyinstrument when installed and asked for.
+# start() / stop() bracket the code to profile; report() returns a text report.
+class Profiler:
+    KINDS = ("cProfile", "pyinstrument") if pyinstrument is not None else ("cProfile",)
+
+    def __init__(self, kind="cProfile"):
+        if kind not in self.KINDS:
+            raise ValueError(f"Profiler '{kind}' is not available")
+        self.kind = kind
+        if kind == "pyinstrument":
+            self._profiler = pyinstrument.Profiler()
+        else:
+            import cProfile
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        (self._profiler.start if self.kind == "pyinstrument" else self._profiler.enable)()
+        return self
+
+    def stop(self):
+        (self._profiler.stop if self.kind == "pyinstrument" else self._profiler.disable)()
+        return self
+
+    def report(self, limit=40):
+        if self.kind == "pyinstrument":
+            return self._profiler.output_text(unicode=True)
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = timings.metrics_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+# Function to serve the registry as Prometheus metrics on `port` from a background thread
+def start_metrics_server(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,158 @@
+import threading
+
+import pandas as pd
+
+from schema import empty_frame
+
+
+# ----------------- CUBE LAYOUT -----------------
+# One row per combination of these dimensions, holding sums and counts.
+# Country, Product Type and Sales year are the sidebar filters; the others are
+# the splits the dashboard tabs report on.
+DIMENSIONS = ["Country", "Product Type", "Sales year", "Sales month", "Product Status",
+              "Subscription Type", "Assistance Type", "Customer Type"]
+FILTER_DIMENSIONS = ["Country", "Product Type", "Sales year"]
+
+# Promotional Event only matters for participating rows, so it gets its own,
+# much smaller table keyed by the filter dimensions
+PROMO_DIMENSIONS = FILTER_DIMENSIONS + ["Promotional Event"]
+
+SUM_COLUMNS = ["Sales Amount", "Profit", "Loss", "Refund Amount", "Subscription Price",
+               "Response Time (days)"]
+MEASURES = ["Rows"] + SUM_COLUMNS + ["Rating Sum", "Rated", "Demos", "Promotions"]
+
+
+# Function to reduce raw rows to cube rows (one groupby over the dimensions)
+def aggregate(df):
+    if "Year" in df.columns:
+        # Typed frame: the date parts were derived at load
+        years, months = df["Year"], df["Month"]
+    else:
+        dates = pd.to_datetime(df["Sales Date"], errors="coerce")
+        years, months = dates.dt.year, dates.dt.month
+    rating = pd.to_numeric(df["Product Rating"], errors="coerce")
+    frame = pd.DataFrame({
+        "Country": df["Country"], "Product Type": df["Product Type"],
+        "Sales year": years, "Sales month": months,
+        "Product Status": df["Product Status"], "Subscription Type": df["Subscription Type"],
+        "Assistance Type": df["Assistance Type"], "Customer Type": df["Customer Type"],
+        "Promotional Event": df["Promotional Event"],
+        "Rows": 1,
+    })
+    for col in SUM_COLUMNS:
+        frame[col] = pd.to_numeric(df[col], errors="coerce")
+    frame["Rating Sum"] = rating.fillna(0)
+    frame["Rated"] = rating.notna().astype(int)
+    frame["Demos"] = (df["Demo Scheduled"] == "Yes").astype(int)
+    frame["Promotions"] = (df["Promotional Event Participation"] == "Yes").astype(int)
+
+    table = _group(frame, DIMENSIONS, MEASURES)
+    promo = _group(frame[frame["Promotions"] == 1], PROMO_DIMENSIONS, ["Rows", "Sales Amount"])
+    return table, promo
+
+
+# Function to sum measures per dimension combination, keeping rows with missing keys
+def _group(frame, dims, measures):
+    return frame.groupby(dims, observed=True, dropna=False)[measures].sum().reset_index()
+
+
+# Function to merge two cube tables (append = concat + re-sum, O(groups))
+def _merge(left, right, dims):
+    if left is None or left.empty:
+        return right
+    return _group(pd.concat([left, right], ignore_index=True), dims, [c for c in left.columns if c not in dims])
+
+
+# Function to keep only the cube rows matching the sidebar selections
+def _select(table, countries=None, products=None, years=None):
+    mask = pd.Series(True, index=table.index)
+    if countries:
+        mask &= table["Country"].isin(countries)
+    if products:
+        mask &= table["Product Type"].isin(products)
+    if years:
+        mask &= table["Sales year"].isin([int(y) for y in years])
+    return table[mask]
+
+
+# Function to narrow a cube table by {dimension: value or list of values}
+def _where(table, where=None):
+    for dim, value in (where or {}).items():
+        table = table[table[dim].isin(value) if isinstance(value, (list, tuple)) else table[dim] == value]
+    return table
+
+
+# Base of the aggregate classes below: their lock guards one process's copy, so a
+# pickled copy (e.g. one sent back from a worker process) gets a fresh lock
+class Synced:
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if k != "_lock"}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+# Pre-aggregated KPI cube, kept in step with an append-only dataset.
+# sync() only aggregates the rows added since the last call; a new `generation`
+# (e.g. the loader's full reload counter) or a shorter frame forces a rebuild.
+# merge() adds the cube of other rows, e.g. another chunk of a store scanned out of core.
+class KPICube(Synced):
+    def __init__(self):
+        self.table = None
+        self.promo = None
+        self.rows_seen = 0
+        self.generation = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df):
+        cube = cls()
+        cube.sync(df)
+        return cube
+
+    def sync(self, df, generation=None):
+        with self._lock:
+            if self.table is None or generation != self.generation or len(df) < self.rows_seen:
+                self.table, self.promo = aggregate(df)
+            elif len(df) > self.rows_seen:
+                table, promo = aggregate(df.iloc[self.rows_seen:])
+                self.table = _merge(self.table, table, DIMENSIONS)
+                self.promo = _merge(self.promo, promo, PROMO_DIMENSIONS)
+            self.rows_seen = len(df)
+            self.generation = generation
+        return self
+
+    def merge(self, other):
+        if other.table is None:
+            return self
+        with self._lock:
+            self.table = _merge(self.table, other.table, DIMENSIONS)
+            self.promo = _merge(self.promo, other.promo, PROMO_DIMENSIONS)
+            self.rows_seen += other.rows_seen
+        return self
+
+    def slice(self, countries=None, products=None, years=None):
+        if self.table is None:  # nothing synced yet (e.g. an empty store): every figure is zero
+            return KPICube.from_frame(empty_frame()).slice()
+        return CubeSlice(_select(self.table, countries, products, years),
+                         _select(self.promo, countries, products, years))
+
+
+# The part of the cube matching one filter state; every KPI the tabs show is read from here
+class CubeSlice:
+    def __init__(self, table, promo):
+        self.table = table
+        self.promo = promo
+
+    def total(self, column="Rows", where=None):
+        return _where(self.table, where)[column].sum()
+
+    def by(self, dim, columns=("Rows",), where=None):
+        return _where(self.table, where).groupby(dim, observed=True)[list(columns)].sum()
+
+    def nunique(self, dim):
+        return self.table.loc[self.table["Rows"] > 0, dim].nunique()
+
+    def promo_summary(self):
+        return self.promo.groupby("Promotional Event", observed=True)[["Sales Amount", "Rows"]].sum()
@@ -0,0 +1,211 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from kpi_cube import CubeSlice, aggregate
+from schema import UUID_DTYPE, uuid_codes
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+
+# Every number and summary table the Sales tab shows
+@dataclass
+class SalesKPIs:
+    total_sales_revenue: float
+    total_profit: float
+    total_loss: float
+    total_customers: int
+    total_countries: int
+    total_job_requests: int
+    ai_assistant_requests: int
+    sales_rep_requests: int
+    top_selling_product: str
+    subscribers: int
+    subscription_revenue: float
+    monthly_revenue: pd.DataFrame
+    product_sales: pd.DataFrame
+    country_sales: pd.DataFrame
+    subscription_price_by_type: pd.DataFrame
+
+
+# Every number and table the Effectiveness tab shows
+@dataclass
+class EffectivenessKPIs:
+    avg_rating: float
+    avg_response_time: float
+    refund_amount: float
+    scheduled_demos: int
+    event_participation: int
+    conversion_rate: float
+    status_counts: pd.DataFrame
+
+
+# The Analysis tab summary tables
+@dataclass
+class AnalysisKPIs:
+    sales_summary: pd.DataFrame
+    product_summary: pd.DataFrame
+    customer_summary: pd.DataFrame
+    subscription_summary: pd.DataFrame
+    geographic_summary: pd.DataFrame
+    promo_summary: pd.DataFrame
+
+
+# Every number and summary table the Sales, Effectiveness and Analysis tabs show
+@dataclass
+class KPIResult:
+    sales: SalesKPIs
+    effectiveness: EffectivenessKPIs
+    analysis: AnalysisKPIs
+
+
+# Function to divide, returning `default` when the denominator is zero
+def _ratio(numerator, denominator, default=float('nan')):
+    return numerator / denominator if denominator > 0 else default
+
+
+# Function to get distinct, repeat and churned customer counts from one encoding of Customer ID.
+# Encoded (binary) IDs are numbered from their bytes, never decoded to text.
+def customer_counts(customer_ids, statuses):
+    if customer_ids.dtype == UUID_DTYPE:
+        codes, distinct = uuid_codes(customer_ids)
+    else:
+        codes, uniques = pd.factorize(customer_ids)
+        distinct = len(uniques)
+    known = codes >= 0
+    per_customer = np.bincount(codes[known], minlength=distinct)
+    cancelled = known & (np.asarray(statuses == "Cancelled", dtype=bool))
+    return distinct, int((per_customer > 1).sum()), np.unique(codes[cancelled]).size
+
+
+# Function to reduce `df` to a cube slice unless one is given
+def _slice(df, cube_slice):
+    return CubeSlice(*aggregate(df)) if cube_slice is None else cube_slice
+
+
+# Function to compute the Sales tab KPIs from a cube slice
+def sales_kpis(df, cube_slice=None):
+    cube_slice = _slice(df, cube_slice)
+    completed = {"Product Status": "Completed"}
+    rows = cube_slice.total()
+
+    monthly_revenue = cube_slice.by("Sales month", ["Sales Amount"], where=completed)["Sales Amount"]
+    monthly_revenue = monthly_revenue.reindex(range(1, 13))
+    monthly_revenue.index = pd.Index(MONTH_NAMES, name="Month")
+
+    product_sales = cube_slice.by("Product Type", ["Sales Amount"], where=completed)
+    product_sales = product_sales.sort_values(by="Sales Amount", ascending=False).reset_index()
+    country_sales = cube_slice.by("Country", ["Sales Amount"], where=completed)
+    country_sales = country_sales.sort_values(by="Sales Amount", ascending=False).reset_index()
+    product_counts = cube_slice.by("Product Type")["Rows"]
+
+    return SalesKPIs(
+        total_sales_revenue=cube_slice.total("Sales Amount", where=completed),
+        total_profit=cube_slice.total("Profit"),
+        total_loss=cube_slice.total("Loss"),
+        total_customers=rows,
+        total_countries=cube_slice.nunique("Country"),
+        total_job_requests=rows,
+        ai_assistant_requests=cube_slice.total(where={"Assistance Type": "AI-powered virtual assistant"}),
+        sales_rep_requests=cube_slice.total(where={"Assistance Type": "Sales Representative"}),
+        top_selling_product=product_counts.idxmax() if len(product_counts) else None,
+        subscribers=cube_slice.total(where={"Subscription Type": ["Premium", "Standard"]}),
+        subscription_revenue=cube_slice.total("Subscription Price", where={"Subscription Type": ["Premium", "Standard"]}),
+        monthly_revenue=monthly_revenue.reset_index(),
+        product_sales=product_sales,
+        country_sales=country_sales,
+        subscription_price_by_type=cube_slice.by("Subscription Type", ["Subscription Price"]).reset_index(),
+    )
+
+
+# Function to compute the Effectiveness tab KPIs from a cube slice
+def effectiveness_kpis(df, cube_slice=None):
+    cube_slice = _slice(df, cube_slice)
+    rows = cube_slice.total()
+    demos = cube_slice.total("Demos")
+    status_counts = cube_slice.by("Product Status")["Rows"].sort_values(ascending=False).reset_index()
+    status_counts.columns = ["Product Status", "Count"]
+
+    return EffectivenessKPIs(
+        avg_rating=_ratio(cube_slice.total("Rating Sum"), rows, 0),
+        avg_response_time=_ratio(cube_slice.total("Response Time (days)"), rows),
+        refund_amount=cube_slice.total("Refund Amount"),
+        scheduled_demos=demos,
+        event_participation=cube_slice.total("Promotions"),
+        conversion_rate=round(_ratio(cube_slice.total(where={"Product Status": "Completed"}), demos, 0) * 100, 2),
+        status_counts=status_counts,
+    )
+
+
+# ----------------- ANALYSIS TABLES -----------------
+# One function per Analysis tab table, so each can be built on its own
+
+def sales_summary_table(cube_slice):
+    rows = cube_slice.total()
+    sales_amount = cube_slice.total("Sales Amount")
+    return pd.DataFrame({
+        "Total Sales Amount": [sales_amount],
+        "Total Transactions": [rows],
+        "Average Sales Amount": [_ratio(sales_amount, rows)],
+        "Total Profit": [cube_slice.total("Profit")],
+        "Total Loss": [cube_slice.total("Loss")],
+        "Total Refunds": [cube_slice.total("Refund Amount")]
+    })
+
+
+def product_summary_table(cube_slice):
+    product_summary = cube_slice.by("Product Type", ["Sales Amount", "Profit", "Rows", "Rating Sum", "Rated"])
+    product_summary["Product Rating"] = product_summary["Rating Sum"] / product_summary["Rated"].where(product_summary["Rated"] > 0)
+    product_summary = product_summary.drop(columns=["Rating Sum", "Rated"]).rename(columns={"Rows": "Total Units Sold"})
+    return product_summary.reset_index().sort_values(by="Sales Amount", ascending=False)
+
+
+# `customers` is customer_counts() of the same rows
+def customer_summary_table(cube_slice, customers):
+    total_customers, repeat_customers, _ = customers
+    customer_summary = cube_slice.by("Customer Type", ["Rows", "Sales Amount"]).rename(
+        columns={"Rows": "Total Customers"}).reset_index()
+    customer_summary["Retention Rate (%)"] = _ratio(repeat_customers, total_customers, 0) * 100
+    return customer_summary
+
+
+def subscription_summary_table(cube_slice, customers):
+    subscription_summary = cube_slice.by("Subscription Type", ["Sales Amount", "Rows"]).rename(
+        columns={"Rows": "Total Active Subscriptions"}).reset_index()
+    subscription_summary["Churn Rate (%)"] = _ratio(customers[2], subscription_summary["Total Active Subscriptions"].sum(), 0) * 100
+    return subscription_summary
+
+
+def geographic_summary_table(cube_slice):
+    return cube_slice.by("Country", ["Sales Amount", "Rows"]).rename(
+        columns={"Rows": "Total Transactions"}).reset_index().sort_values(by="Sales Amount", ascending=False)
+
+
+def promo_summary_table(cube_slice):
+    return cube_slice.promo_summary().rename(columns={"Rows": "Total Transactions"}).reset_index()
+
+
+# Function to compute the Analysis tab summary tables from a cube slice.
+# Only the distinct-customer figures (retention and churn) need the raw Customer ID column.
+def analysis_kpis(df, cube_slice=None):
+    cube_slice = _slice(df, cube_slice)
+    customers = customer_counts(df["Customer ID"], df["Product Status"])
+    return AnalysisKPIs(
+        sales_summary=sales_summary_table(cube_slice),
+        product_summary=product_summary_table(cube_slice),
+        customer_summary=customer_summary_table(cube_slice, customers),
+        subscription_summary=subscription_summary_table(cube_slice, customers),
+        geographic_summary=geographic_summary_table(cube_slice),
+        promo_summary=promo_summary_table(cube_slice),
+    )
+
+
+# Function to compute all tab KPIs for `df`.
+# The rows are reduced to cube rows in one groupby pass (or `cube_slice`, a
+# pre-aggregated slice matching `df`, is used as is); every KPI and summary table
+# is then read off that small table.
+def compute_kpis(df, cube_slice=None):
+    cube_slice = _slice(df, cube_slice)
+    return KPIResult(sales_kpis(df, cube_slice), effectiveness_kpis(df, cube_slice), analysis_kpis(df, cube_slice))
@@ -0,0 +1,162 @@
+import uuid
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from Generating_data import STATUS_MEANING
+from schema import COLUMN_DTYPES, apply_schema
+from data_loader import read_csv
+from storage import open_store, CSVStore
+
+# ----------------- SCHEMA REGISTRY -----------------
+# Every layout the sales data has been saved in, oldest first. Version 1 and 2 are
+# the layouts of the files in backups/ (version 2 dropped Response Time); version 3
+# is the current 38-column dataset.
+LEGACY_V1_COLUMNS = ["Year", "Country", "Customer Name", "Email", "Phone Number", "Job Requested",
+                     "Response Time", "Event Participation", "Page Accessed", "Sales Revenue",
+                     "Payment Method", "Resolution Status", "Satisfaction Rating"]
+LEGACY_V2_COLUMNS = [c for c in LEGACY_V1_COLUMNS if c != "Response Time"]
+
+# Legacy columns carried over as they are, under their current names.
+# Page Accessed has no counterpart and is dropped.
+LEGACY_RENAMES = {
+    "Country": "Country", "Customer Name": "Customer Name", "Email": "Email", "Phone Number": "Phone",
+    "Event Participation": "Promotional Event Participation", "Sales Revenue": "Sales Amount",
+    "Payment Method": "Payment Method",
+}
+LEGACY_STATUSES = {"Resolved": "Completed", "Pending": "In Progress", "Failed": "Cancelled"}
+# What each legacy Job Requested value says in the current columns
+LEGACY_JOBS = {
+    "AI-Powered Virtual Assistant": {"Assistance Type": "AI-powered virtual assistant"},
+    "Chatting with Sales Representative": {"Assistance Type": "Sales Representative"},
+    "Scheduled Demo": {"Demo Scheduled": "Yes"},
+    "Inquiring about Events": {"Inquries": "Promotional event"},
+    "Software Assistance": {"Inquries": "Issue with product"},
+    "Prototyping solutions": {"Inquries": "Product question", "Product Type": "Prototyping Tool"},
+}
+# Legacy ratings outside the current 1-5 scale are dropped
+RATING_RANGE = (1, 5)
+# Legacy customers get a stable Customer ID derived from their email address
+LEGACY_CUSTOMER_NAMESPACE = uuid.UUID("6f1c1d2e-1b5c-4e53-9a51-5d7f2f0a3c11")
+
+SCHEMA_VERSIONS = {
+    1: {"columns": LEGACY_V1_COLUMNS},
+    2: {"columns": LEGACY_V2_COLUMNS},
+    3: {"columns": list(COLUMN_DTYPES)},
+}
+CURRENT_VERSION = max(SCHEMA_VERSIONS)
+
+
+# Function to tell which schema version a header (list of column names) belongs to
+def detect_version(columns):
+    columns = [c.strip() for c in columns]
+    for version, spec in SCHEMA_VERSIONS.items():
+        if columns == spec["columns"]:
+            return version
+    for version, spec in SCHEMA_VERSIONS.items():
+        if set(columns) == set(spec["columns"]):
+            return version
+    raise ValueError(f"Unknown data layout: {columns}")
+
+
+# Function to map `values` through a lookup table (missing keys give NA), one lookup per distinct value
+def _lookup(values, table):
+    values = values.astype("string").str.strip()
+    return values.map(table).astype("string")
+
+
+# Function to derive Customer IDs from emails (one uuid5 per distinct address)
+def _customer_ids(emails):
+    codes, uniques = pd.factorize(emails.astype("string").str.strip().str.lower())
+    ids = np.array([str(uuid.uuid5(LEGACY_CUSTOMER_NAMESPACE, e)) for e in uniques] + [None], dtype=object)
+    return pd.Series(ids[codes], index=emails.index, dtype="string")
+
+
+# Function to convert a frame in a legacy layout into the current layout and dtypes.
+# Legacy files have no Sales Date: the legacy Year is kept as the Year column and
+# the date columns stay empty. Fields the legacy layout never recorded are NA.
+def _migrate_legacy(df):
+    out = pd.DataFrame(index=df.index, columns=list(COLUMN_DTYPES), dtype=object)
+    for old, new in LEGACY_RENAMES.items():
+        out[new] = df[old]
+    out["Customer ID"] = _customer_ids(df["Email"])
+
+    jobs = df["Job Requested"].astype("string").str.strip()
+    jobs = jobs.mask(jobs.str.lower() == "inquiring about events", "Inquiring about Events")
+    for column in ("Assistance Type", "Inquries", "Product Type", "Demo Scheduled"):
+        table = {job: fields[column] for job, fields in LEGACY_JOBS.items() if column in fields}
+        out[column] = _lookup(jobs, table)
+    out["Demo Scheduled"] = out["Demo Scheduled"].fillna("No")
+
+    status = _lookup(df["Resolution Status"], LEGACY_STATUSES)
+    out["Product Status"] = status
+    out["Meaning"] = _lookup(status, STATUS_MEANING)
+
+    rating = pd.to_numeric(df["Satisfaction Rating"], errors="coerce")
+    out["Product Rating"] = rating.where(rating.between(*RATING_RANGE))
+    if "Response Time" in df.columns:
+        # Stored as the repr of a one-element tuple, e.g. "(10,)"
+        out["Response Time (days)"] = pd.to_numeric(
+            df["Response Time"].astype("string").str.extract(r"(\d+)", expand=False), errors="coerce")
+
+    out = apply_schema(out)
+    out["Year"] = pd.to_numeric(df["Year"], errors="coerce").astype("Int16")
+    return out
+
+
+# Function to bring a raw frame of any registered version into the current typed layout
+def migrate_frame(df, version=None):
+    df.columns = df.columns.str.strip()
+    version = detect_version(df.columns) if version is None else version
+    if version == CURRENT_VERSION:
+        return apply_schema(df)
+    return _migrate_legacy(df)
+
+
+# Function to migrate data files of any registered version into `store`, chunk by chunk.
+# Rows already seen in an earlier file of the run (backups repeat each other) are
+# skipped unless `deduplicate` is False. Returns {path: (version, rows written)}.
+def migrate_files(paths, store, chunksize=100_000, deduplicate=True):
+    if isinstance(store, CSVStore):
+        raise ValueError("Legacy rows only carry a year; migrate them into a Parquet store")
+    seen = set()  # row hashes of the earlier files
+    report = {}
+    for path in paths:
+        version, written, hashes_of_file = None, 0, set()
+        for chunk in read_csv(path, LEGACY_RENAMES, chunksize=chunksize):
+            chunk.columns = chunk.columns.str.strip()
+            version = version or detect_version(chunk.columns)
+            if deduplicate:
+                # Hash the shared legacy fields so the same row in a v1 and a v2 file matches.
+                # Identical rows within one file are separate records and are all kept.
+                hashed = chunk.drop(columns=["Response Time"], errors="ignore")
+                hashes = pd.util.hash_pandas_object(hashed, index=False).tolist()
+                hashes_of_file.update(hashes)
+                chunk = chunk[np.array([h not in seen for h in hashes], dtype=bool)]
+            if len(chunk):
+                store.append(migrate_frame(chunk, version))
+                written += len(chunk)
+        seen |= hashes_of_file
+        report[path] = (version, written)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate sales data files of any schema version into a store")
+    parser.add_argument("files", nargs="+", help="CSV files, e.g. backups/*.csv")
+    parser.add_argument("--out", required=True, help="Parquet store directory")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--keep-duplicates", action="store_true", help="write rows repeated across files again")
+    args = parser.parse_args(argv)
+
+    report = migrate_files(sorted(args.files), open_store(args.out), args.chunk_size,
+                           deduplicate=not args.keep_duplicates)
+    for path, (version, written) in report.items():
+        print(f"{path}: schema v{version}, {written} rows")
+    print(f"{sum(w for _, w in report.values())} rows written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
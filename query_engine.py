@@ -0,0 +1,167 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from kpi_cube import FILTER_DIMENSIONS, KPICube, Synced, _group, _merge, _select
+from rollups import SalesRollups
+from sketches import SketchCube
+from schema import concat_frames, empty_frame
+from storage import CSVStore, SCAN_CHUNK_ROWS
+
+
+# ----------------- OUT-OF-CORE EXECUTION -----------------
+# For stores too large to load into one DataFrame. The store is scanned in partitions
+# (byte ranges of the CSV file, files of the Parquet store), each read as chunks of at
+# most SCAN_CHUNK_ROWS rows with the sidebar predicates applied during the scan. Every
+# chunk is reduced to partial aggregates (KPI cube, rollups, sketches, response-time
+# counts) that are merged across chunks and partitions; partitions can be aggregated
+# in parallel by a process pool. Peak memory is one chunk per worker plus the
+# aggregates, whose size depends on the number of cells, not rows.
+
+# Columns the aggregates are built from; the scan reads nothing else
+AGGREGATE_COLUMNS = ["Customer ID", "Country", "Customer Type", "Subscription Type", "Subscription Price",
+                     "Product Type", "Assistance Type", "Sales Amount", "Sales Date", "Demo Scheduled",
+                     "Promotional Event Participation", "Promotional Event", "Response Time (days)",
+                     "Product Status", "Refund Amount", "Product Rating", "Profit", "Loss", "Year"]
+RESPONSE_TIME_DIMENSIONS = FILTER_DIMENSIONS + ["Response Time (days)"]
+TASKS_PER_WORKER = 4
+
+
+# Function to get the partitions of a store holding the selected years
+def _partitions(store, years=None):
+    return store.partitions() if isinstance(store, CSVStore) else store.partitions(years=years)
+
+
+# Function to read the rows of a store matching the sidebar selections as typed chunks
+# (at least one, possibly empty), without ever holding more than one chunk
+def scan(store, columns=None, countries=None, products=None, years=None, chunk_rows=SCAN_CHUNK_ROWS):
+    empty = True
+    for partition in _partitions(store, years):
+        for chunk in store.scan(partition, columns, countries, products, years, chunk_rows):
+            empty = False
+            yield chunk
+    if empty:
+        yield empty_frame(columns)
+
+
+# Function to count the rows per cube cell and response time
+def response_time_table(df):
+    frame = pd.DataFrame({"Country": df["Country"], "Product Type": df["Product Type"], "Sales year": df["Year"],
+                          "Response Time (days)": df["Response Time (days)"], "Rows": 1})
+    return _group(frame, RESPONSE_TIME_DIMENSIONS, ["Rows"])
+
+
+# Everything the dashboard tabs need from a store, built by scanning it out of core.
+# sync() only scans what was added since the last call: CSV rows past the last byte
+# scanned, Parquet files not seen before. A changed CSV header, a shorter CSV file or
+# a Parquet file that went away (e.g. compaction) forces a rebuild.
+class StoreAggregates(Synced):
+    def __init__(self):
+        self.cube = KPICube()
+        self.rollups = SalesRollups()
+        self.sketches = SketchCube()
+        self.response_times = None  # Country, Product Type, Sales year, Response Time (days), Rows
+        self.rows_seen = 0
+        self.scanned = None  # CSV: (header, end of the last byte range); Parquet: set of files
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df):
+        aggregates = cls()
+        aggregates.cube.sync(df)
+        aggregates.rollups.sync(df)
+        aggregates.sketches.sync(df)
+        aggregates.response_times = response_time_table(df)
+        aggregates.rows_seen = len(df)
+        return aggregates
+
+    def merge(self, other):
+        with self._lock:
+            self.cube.merge(other.cube)
+            self.rollups.merge(other.rollups)
+            self.sketches.merge(other.sketches)
+            if other.response_times is not None:
+                self.response_times = _merge(self.response_times, other.response_times, RESPONSE_TIME_DIMENSIONS)
+            self.rows_seen += other.rows_seen
+        return self
+
+    def sync(self, store, years=None, workers=1):
+        if isinstance(store, CSVStore):
+            header = store.header()
+            if self.scanned is None or header != self.scanned[0] or os.path.getsize(store.path) < self.scanned[1]:
+                self.__init__()
+            partitions = store.partitions(start=self.scanned[1] if self.scanned else 0)
+            scanned = (header, partitions[-1][1] if partitions else self.scanned[1] if self.scanned else 0)
+        else:
+            files = store.partitions(years=years)
+            if self.scanned is None or not self.scanned <= set(files):
+                self.__init__()
+            partitions = [f for f in files if f not in (self.scanned or ())]
+            scanned = set(files)
+        partial = _merge_all(_aggregate(store, partitions, workers))
+        if partial is not None:
+            self.merge(partial)
+        self.scanned = scanned
+        return self
+
+    # Function to list the values of a filter dimension found in the store (sidebar options)
+    def values(self, dim):
+        table = self.cube.table
+        return [] if table is None else sorted(table[dim].dropna().unique().tolist())
+
+    # Function to count the rows per response time matching the sidebar selections
+    def response_time_counts(self, countries=None, products=None, years=None):
+        if self.response_times is None:
+            return pd.Series(dtype=int)
+        table = _select(self.response_times, countries, products, years)
+        return table.groupby("Response Time (days)")["Rows"].sum()
+
+
+# Function to regroup scanned chunks into frames of about `chunk_rows` rows: small
+# files give small chunks, and every aggregation step has a fixed cost
+def _rebatch(chunks, chunk_rows):
+    pending, rows = [], 0
+    for chunk in chunks:
+        pending.append(chunk)
+        rows += len(chunk)
+        if rows >= chunk_rows:
+            yield concat_frames(pending)
+            pending, rows = [], 0
+    if pending:
+        yield concat_frames(pending) if rows else pending[0]
+
+
+# Function to reduce some partitions of a store to their aggregates, chunk by chunk
+def aggregate_partitions(store, partitions, chunk_rows=SCAN_CHUNK_ROWS):
+    chunks = (chunk for partition in partitions
+              for chunk in store.scan(partition, AGGREGATE_COLUMNS, chunk_rows=chunk_rows))
+    return _merge_all(StoreAggregates.from_frame(df) for df in _rebatch(chunks, chunk_rows)) or StoreAggregates()
+
+
+# Function to merge aggregates as they arrive, like a binary counter: a partial is
+# merged into the previous one once that one holds no more rows, so every row is
+# re-merged O(log n) times instead of once per later partial
+def _merge_all(partials):
+    stack = []
+    for partial in partials:
+        stack.append(partial)
+        while len(stack) > 1 and stack[-2].rows_seen <= stack[-1].rows_seen:
+            top = stack.pop()
+            stack[-1].merge(top)
+    while len(stack) > 1:
+        top = stack.pop()
+        stack[-1].merge(top)
+    return stack[0] if stack else None
+
+
+# Function to aggregate partitions, in `workers` processes when there are several:
+# each task is every n-th partition, with a few tasks per worker to even out their sizes
+def _aggregate(store, partitions, workers=1):
+    if workers > 1 and len(partitions) > 1:
+        tasks = min(len(partitions), TASKS_PER_WORKER * workers)
+        with ProcessPoolExecutor(max_workers=min(workers, tasks)) as pool:
+            yield from pool.map(aggregate_partitions, [store] * tasks, [partitions[i::tasks] for i in range(tasks)])
+    elif partitions:
+        yield aggregate_partitions(store, partitions)
@@ -0,0 +1,130 @@
+import threading
+
+import pandas as pd
+
+from kpi_cube import Synced, _group, _merge
+from schema import empty_frame
+
+
+# ----------------- ROLLUP LAYOUT -----------------
+# Sales per calendar day, month and year, broken down by the Country and Product Type
+# filters. A table holds at most (periods x countries x product types) rows however
+# many transactions it covers. Revenue is the Sales Amount of completed sales (the
+# figure the dashboard charts); Profit, Loss and Refund Amount are summed over all
+# sales. Rows without a Sales Date (migrated legacy data) only count in the yearly table.
+PERIODS = {"daily": "Day", "monthly": "Month", "yearly": "Year"}
+BREAKDOWN = ["Country", "Product Type"]
+MEASURES = ["Rows", "Completed", "Revenue", "Profit", "Loss", "Refund Amount"]
+
+
+# Function to reduce raw rows to the daily, monthly and yearly rollup tables
+def rollup(df):
+    if "Day" in df.columns:
+        # Typed frame: the date parts were derived at load
+        days, years = df["Day"], df["Year"]
+    else:
+        dates = pd.to_datetime(df["Sales Date"], errors="coerce")
+        days, years = dates.dt.normalize(), dates.dt.year
+    completed = df["Product Status"] == "Completed"
+    frame = pd.DataFrame({
+        "Country": df["Country"], "Product Type": df["Product Type"],
+        "Day": days, "Month": days - pd.to_timedelta(days.dt.day - 1, unit="D"), "Year": years,
+        "Rows": 1, "Completed": completed.astype(int),
+        "Revenue": pd.to_numeric(df["Sales Amount"], errors="coerce").where(completed, 0.0),
+    })
+    for col in ["Profit", "Loss", "Refund Amount"]:
+        frame[col] = pd.to_numeric(df[col], errors="coerce")
+    return {freq: _group(frame[frame[period].notna()], [period] + BREAKDOWN, MEASURES)
+            for freq, period in PERIODS.items()}
+
+
+# Function to get the year of every row of a rollup table
+def _years(table, period):
+    return table[period] if period == "Year" else table[period].dt.year
+
+
+# Function to keep only the rollup rows matching the sidebar selections
+def _select(table, period, countries=None, products=None, years=None):
+    mask = pd.Series(True, index=table.index)
+    if countries:
+        mask &= table["Country"].isin(countries)
+    if products:
+        mask &= table["Product Type"].isin(products)
+    if years:
+        mask &= _years(table, period).isin([int(y) for y in years])
+    return table[mask]
+
+
+# Function to keep the rollup rows whose period overlaps [start, end] (dates, inclusive)
+def _between(table, period, start=None, end=None):
+    # Periods are keyed by their first day (daily/monthly) or their year number
+    if start is not None:
+        start = pd.Timestamp(start).normalize()
+        start = start.year if period == "Year" else start.replace(day=1) if period == "Month" else start
+    if end is not None:
+        end = pd.Timestamp(end).year if period == "Year" else pd.Timestamp(end)
+    mask = pd.Series(True, index=table.index)
+    if start is not None:
+        mask &= table[period] >= start
+    if end is not None:
+        mask &= table[period] <= end
+    return table[mask]
+
+
+# Daily, monthly and yearly rollups kept in step with an append-only dataset, like
+# the KPI cube: sync() only rolls up the rows added since the last call; a new
+# `generation` (e.g. the loader's full reload counter) or a shorter frame forces a rebuild.
+# merge() adds the rollups of other rows.
+class SalesRollups(Synced):
+    def __init__(self):
+        self.tables = None
+        self.rows_seen = 0
+        self.generation = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df):
+        rollups = cls()
+        rollups.sync(df)
+        return rollups
+
+    def sync(self, df, generation=None):
+        with self._lock:
+            if self.tables is None or generation != self.generation or len(df) < self.rows_seen:
+                self.tables = rollup(df)
+            elif len(df) > self.rows_seen:
+                tables = rollup(df.iloc[self.rows_seen:])
+                self.tables = {freq: _merge(self.tables[freq], tables[freq], [period] + BREAKDOWN)
+                               for freq, period in PERIODS.items()}
+            self.rows_seen = len(df)
+            self.generation = generation
+        return self
+
+    def merge(self, other):
+        if other.tables is None:
+            return self
+        with self._lock:
+            self.tables = other.tables if self.tables is None else \
+                {freq: _merge(self.tables[freq], other.tables[freq], [period] + BREAKDOWN)
+                 for freq, period in PERIODS.items()}
+            self.rows_seen += other.rows_seen
+        return self
+
+    def slice(self, countries=None, products=None, years=None):
+        if self.tables is None:  # nothing synced yet (e.g. an empty store): empty series
+            return SalesRollups.from_frame(empty_frame()).slice()
+        return RollupSlice({freq: _select(self.tables[freq], period, countries, products, years)
+                            for freq, period in PERIODS.items()})
+
+
+# The part of the rollups matching one filter state
+class RollupSlice:
+    def __init__(self, tables):
+        self.tables = tables
+
+    # Function to get `columns` per period of `freq` ("daily", "monthly" or "yearly"),
+    # optionally only for the periods overlapping [start, end]
+    def series(self, freq, columns=("Revenue",), start=None, end=None):
+        period = PERIODS[freq]
+        table = _between(self.tables[freq], period, start, end)
+        return table.groupby(period)[list(columns)].sum()
@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import union_categoricals
+
+
+# ----------------- DATASET SCHEMA -----------------
+# Column order and dtype of every column in AI_Solution_Dataset.csv.
+# "category" columns hold a handful of distinct values (statuses, countries, product
+# types), so they are stored as pandas Categoricals: small integer codes per row
+# plus one index of the distinct values;
+# "uuid" columns are stored as 16-byte binary values; "string" columns (names,
+# contact details, comments: thousands of distinct values, which categories would
+# have to re-unify on every append) are Arrow-backed strings; "datetime" columns are
+# parsed once at load.
+COLUMN_DTYPES = {
+    "Customer ID": "uuid", "Customer Name": "string", "Email": "string", "Phone": "string",
+    "Country": "category", "Gender": "category", "Age": "Int8", "Company Name": "string",
+    "Customer Type": "category", "Subscription Type": "category",
+    "Benefits of Membership Type": "category", "Subscription Duration": "category",
+    "Subscription Date": "datetime", "Subscription Price": "float64", "Product ID": "Int16",
+    "Product Type": "category", "Inquries": "category", "Assistance Type": "category",
+    "Sales Rep ID": "uuid", "Sales Rep Name": "string", "Sales Rep Email": "string",
+    "Sales Rep Phone": "string", "Cost of Product": "float64", "Sales Amount": "float64",
+    "Sales Date": "datetime", "Sales Time": "string", "Payment Method": "category",
+    "Demo Scheduled": "category", "Promotional Event Participation": "category",
+    "Promotional Event": "category", "Response Time (days)": "Int8", "Product Status": "category",
+    "Meaning": "category", "Refund Amount": "float64", "Product Rating": "Int8", "Comments": "string",
+    "Profit": "float64", "Loss": "float64",
+}
+
+CATEGORICAL_COLUMNS = [c for c, t in COLUMN_DTYPES.items() if t == "category"]
+DATE_COLUMNS = [c for c, t in COLUMN_DTYPES.items() if t == "datetime"]
+UUID_COLUMNS = [c for c, t in COLUMN_DTYPES.items() if t == "uuid"]
+NUMERIC_COLUMNS = [c for c, t in COLUMN_DTYPES.items() if t not in ("category", "datetime", "uuid", "string")]
+# Columns read from CSV as text: left to inference, "+475098658225" or "0012" would
+# come back as numbers without their sign and leading zeros
+TEXT_COLUMNS = [c for c, t in COLUMN_DTYPES.items() if t in ("category", "uuid", "string")]
+
+# Derived from Sales Date at load so widgets never re-parse dates
+DERIVED_COLUMNS = ["Year", "Month", "Day"]
+
+UUID_DTYPE = pd.ArrowDtype(pa.binary(16))
+STRING_DTYPE = pd.StringDtype("pyarrow")
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+# Value of each ASCII character as a hex digit (255: not a hex digit)
+_HEX_VALUES = np.full(256, 255, dtype=np.uint8)
+_HEX_VALUES[_HEX_DIGITS] = np.arange(16)
+_HEX_VALUES[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+# Positions of the hex digits and dashes in the 36-character form
+_UUID_HEX_POSITIONS = np.r_[0:8, 9:13, 14:18, 19:23, 24:36]
+_UUID_DASH_POSITIONS = [8, 13, 18, 23]
+
+
+# Function to give a raw (CSV-parsed) frame the schema dtypes and the derived date columns.
+# Columns outside the schema are left untouched.
+def apply_schema(df):
+    df = df.copy()
+    for col in df.columns:
+        dtype = COLUMN_DTYPES.get(col)
+        if dtype is None:
+            continue
+        if dtype == "datetime":
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif dtype == "category":
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("string").astype("category")
+        elif dtype == "uuid":
+            if df[col].dtype != UUID_DTYPE:
+                df[col] = encode_uuids(df[col])
+        elif dtype == "string":
+            df[col] = df[col].astype(STRING_DTYPE)
+        else:
+            df[col] = _to_numeric(df[col], dtype)
+    if "Sales Date" in df.columns:
+        df = add_date_parts(df)
+    return df
+
+
+# Function to get the read_csv dtype= mapping for a header: text columns as str.
+# Header names may carry stray spaces; `renames` maps other layouts' names to the schema's.
+def csv_dtypes(columns, renames=None):
+    renames = renames or {}
+    return {c: str for c in columns if renames.get(c.strip(), c.strip()) in TEXT_COLUMNS}
+
+
+# Function to convert values to a numeric schema dtype. Integer columns round fractional
+# values (e.g. a hand-edited rating of 4.5) and leave values outside the dtype's range
+# missing, so one bad cell never fails a whole load.
+def _to_numeric(values, dtype):
+    numbers = pd.to_numeric(values, errors='coerce')
+    if pd.api.types.is_integer_dtype(pd.api.types.pandas_dtype(dtype)):
+        limits = np.iinfo(pd.api.types.pandas_dtype(dtype).numpy_dtype)
+        numbers = numbers.astype("float64").round().where(numbers.between(limits.min, limits.max))
+    return numbers.astype(dtype)
+
+
+# Function to get a typed frame without rows (of `columns`, by default every schema column)
+def empty_frame(columns=None):
+    return apply_schema(pd.DataFrame({c: pd.Series(dtype=object) for c in COLUMN_DTYPES
+                                      if columns is None or c in columns}))
+
+
+# Function to add Year / Month / Day columns from the (already parsed) Sales Date.
+# Rows without a Sales Date keep a Year they already have (migrated legacy rows).
+def add_date_parts(df):
+    dates = df["Sales Date"]
+    years = dates.dt.year.astype("Int16")
+    if "Year" in df.columns:
+        years = years.fillna(pd.to_numeric(df["Year"], errors="coerce").astype("Int16"))
+    df["Year"] = years
+    df["Month"] = dates.dt.month.astype("Int8")
+    df["Day"] = dates.dt.normalize()
+    return df
+
+
+# Function to concatenate typed frames, keeping categorical columns categorical.
+# Plain pd.concat falls back to object dtype when two chunks saw different values.
+def concat_frames(frames):
+    frames = [f for f in frames if f is not None and len(f)]
+    if len(frames) < 2:
+        return frames[0] if frames else None
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            if any(not isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+                continue
+            categories = union_categoricals([f[col].array for f in frames]).categories
+            frames = [f.assign(**{col: f[col].cat.set_categories(categories)})
+                      if not f[col].cat.categories.equals(categories) else f for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+# ----------------- UUID ENCODING -----------------
+# Function to encode UUID strings ("6f1c1d2e-1b5c-...") as 16-byte binary values.
+# Missing values, and values that are not UUIDs, become NA.
+def encode_uuids(values):
+    text = values.astype(STRING_DTYPE).str.strip().str.lower()
+    valid = (text.str.len() == 36).fillna(False).to_numpy(dtype=bool)
+    chars = np.zeros((len(text), 36), dtype=np.uint8)
+    if valid.any():
+        chars[valid] = np.frombuffer(text[valid].to_numpy(dtype=object).astype("S36").tobytes(),
+                                     dtype=np.uint8).reshape(-1, 36)
+    digits = _HEX_VALUES[chars[:, _UUID_HEX_POSITIONS]]
+    valid &= (digits != 255).all(axis=1) & (chars[:, _UUID_DASH_POSITIONS] == ord("-")).all(axis=1)
+    data = np.ascontiguousarray((digits[:, 0::2] << 4) | digits[:, 1::2])
+    array = pa.Array.from_buffers(pa.binary(16), len(text),
+                                  [pa.py_buffer(np.packbits(valid, bitorder="little")), pa.py_buffer(data)],
+                                  null_count=int((~valid).sum()))
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=values.index, name=values.name)
+
+
+# Function to get the 16 bytes of every value of an encoded UUID column as an
+# (n, 16) uint8 array, plus a mask of the non-missing values
+def uuid_bytes(values):
+    array = pa.array(values.array)  # through the __arrow_array__ protocol
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    data = np.frombuffer(array.buffers()[1], dtype=np.uint8, count=16 * (array.offset + len(array)))
+    valid = array.is_valid().to_numpy(zero_copy_only=False)
+    return data[16 * array.offset:].reshape(-1, 16), valid
+
+
+# Function to decode an encoded UUID column back to its 36-character strings
+def decode_uuids(values):
+    data, valid = uuid_bytes(values)
+    chars = np.full((len(data), 36), ord("-"), dtype=np.uint8)
+    digits = np.empty((len(data), 32), dtype=np.uint8)
+    digits[:, 0::2] = _HEX_DIGITS[data >> 4]
+    digits[:, 1::2] = _HEX_DIGITS[data & 0x0F]
+    chars[:, _UUID_HEX_POSITIONS] = digits
+    text = np.ascontiguousarray(chars).view("S36").ravel().astype(str).astype(object)
+    text[~valid] = None
+    return pd.Series(text, index=values.index, name=values.name, dtype=STRING_DTYPE)
+
+
+# Function to number the distinct values of an encoded UUID column: returns codes
+# (-1 for missing) and the number of distinct values. Works on the two 64-bit halves
+# of each value, without decoding to text.
+def uuid_codes(values):
+    data, valid = uuid_bytes(values)
+    words = (data if valid.all() else data[valid]).view(np.uint64)
+    high, _ = pd.factorize(words[:, 0])
+    low, low_values = pd.factorize(words[:, 1])
+    keys, uniques = pd.factorize(high.astype(np.int64) * len(low_values) + low)
+    codes = np.full(len(data), -1, dtype=np.intp)
+    codes[valid] = keys
+    return codes, len(uniques)
+
+
+# Function to turn the encoded columns of a typed frame back into text, for writers
+# (CSV, Parquet files, JSON) whose readers expect the dataset's original values
+def decode_columns(df):
+    encoded = [c for c in df.columns if df[c].dtype == UUID_DTYPE]
+    if not encoded:
+        return df
+    return df.assign(**{c: decode_uuids(df[c]) for c in encoded})
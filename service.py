@@ -0,0 +1,256 @@
+# FastAPI query service over the sales dataset.
+#
+#   uvicorn service:app --host 0.0.0.0 --port 8000
+#
+# Every request is answered from one shared, typed copy of the dataset held in
+# data_cache.shared_cache and refreshed when the store's fingerprint changes.
+import os
+import json
+import time
+from dataclasses import fields
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from data_cache import shared_cache, file_fingerprint
+from data_loader import IncrementalCSVLoader
+from kpi_cube import KPICube
+from rollups import SalesRollups, MEASURES as ROLLUP_MEASURES
+from kpis import compute_kpis
+from filters import FilterIndex
+from instrumentation import timed, observe, timings
+from chart_data import MAX_SERIES_POINTS, downsample
+from export import FORMATS as EXPORT_FORMATS, iter_export
+from storage import open_store, CSVStore
+from schema import decode_columns
+
+DATA_STORE = os.environ.get('SALES_DATA_STORE', 'AI_Solution_Dataset.csv')
+MAX_PAGE_SIZE = 10_000
+STREAM_CHUNK_ROWS = 50_000
+
+SALES_FIELDS = ["total_sales_revenue", "total_profit", "total_loss", "total_customers", "total_countries",
+                "total_job_requests", "ai_assistant_requests", "sales_rep_requests", "top_selling_product",
+                "subscribers", "subscription_revenue", "monthly_revenue", "product_sales", "country_sales",
+                "subscription_price_by_type"]
+EFFECTIVENESS_FIELDS = ["avg_rating", "avg_response_time", "refund_amount", "scheduled_demos",
+                        "event_participation", "conversion_rate", "status_counts"]
+ANALYSIS_FIELDS = ["sales_summary", "product_summary", "customer_summary", "subscription_summary",
+                   "geographic_summary", "promo_summary", "status_counts"]
+
+app = FastAPI(title="AI Solution Sales API")
+store = open_store(DATA_STORE)
+# CSV: only rows appended since the last load are parsed. One loader per process,
+# outside the size-bounded shared_cache, whose evictions would drop its byte offset.
+csv_loader = IncrementalCSVLoader(DATA_STORE) if isinstance(store, CSVStore) else None
+
+
+# Every request's latency is recorded per route in the timing registry (see /metrics)
+@app.middleware("http")
+async def time_requests(request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    observe(f"api {getattr(route, 'path', request.url.path)}", time.perf_counter() - start,
+            status=response.status_code)
+    return response
+
+
+# ----------------- SHARED DATASET -----------------
+# Function to get the current dataset version and the shared typed DataFrame
+def get_dataset():
+    version = file_fingerprint(DATA_STORE)
+    if version is None:
+        raise HTTPException(status_code=503, detail=f"No data at {DATA_STORE}")
+    with timed("load_data"):
+        if isinstance(store, CSVStore):
+            df = shared_cache.get(("data", DATA_STORE), version, lambda previous: csv_loader.load())
+        else:
+            df = shared_cache.get(("data", DATA_STORE, ()), version, lambda previous: store.read())
+    return version, df
+
+
+# Function to get row positions matching the filters (cached per filter state)
+def filter_positions(version, df, country, product, year):
+    key = ("positions", DATA_STORE, tuple(country or ()), tuple(product or ()), tuple(year or ()))
+
+    def build(previous):
+        index = shared_cache.get(("filter_index", DATA_STORE, ()), version, lambda previous: FilterIndex(df))
+        rows = index.rows(country, product, year)
+        return np.arange(len(df)) if rows is None else rows
+
+    with timed("filters"):
+        return shared_cache.get(key, version, build)
+
+
+# Function to get the KPIs for one filter state, sliced from the shared cube
+def get_kpis(country, product, year):
+    version, df = get_dataset()
+    positions = filter_positions(version, df, country, product, year)
+
+    def build_cube(previous):
+        if isinstance(store, CSVStore):
+            return (previous or KPICube()).sync(df, generation=csv_loader.full_reloads)
+        return KPICube.from_frame(df)
+
+    cube_key = ("cube", DATA_STORE) if isinstance(store, CSVStore) else ("cube", DATA_STORE, ())
+    with timed("cube"):
+        cube = shared_cache.get(cube_key, version, build_cube)
+    key = ("kpis", DATA_STORE, tuple(country or ()), tuple(product or ()), tuple(year or ()))
+    with timed("kpis"):
+        return shared_cache.get(key, version, lambda previous: compute_kpis(
+            df.iloc[positions], cube.slice(countries=country, products=product, years=year)))
+
+
+# Function to get the shared daily/monthly/yearly rollups, kept in step like the cube
+def get_rollups(version, df):
+    def build(previous):
+        if isinstance(store, CSVStore):
+            return (previous or SalesRollups()).sync(df, generation=csv_loader.full_reloads)
+        return SalesRollups.from_frame(df)
+
+    key = ("rollups", DATA_STORE) if isinstance(store, CSVStore) else ("rollups", DATA_STORE, ())
+    with timed("rollups"):
+        return shared_cache.get(key, version, build)
+
+
+# ----------------- JSON HELPERS -----------------
+def _jsonable(value):
+    if isinstance(value, pd.DataFrame):
+        return json.loads(decode_columns(value).to_json(orient="records", date_format="iso"))
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+# Function to turn the named KPIs of a KPIResult (all of them by default) into JSON values
+def _kpi_payload(result, names=None):
+    values = {f.name: getattr(part, f.name) for part in (result.sales, result.effectiveness, result.analysis)
+              for f in fields(part)}
+    return {name: _jsonable(values[name]) for name in (names or values)}
+
+
+def _json_response(payload):
+    return Response(content=json.dumps(payload), media_type="application/json")
+
+
+# ----------------- ENDPOINTS -----------------
+@app.get("/health")
+async def health():
+    return {"store": DATA_STORE, "version": file_fingerprint(DATA_STORE), "cache": shared_cache.stats()}
+
+
+# Per-stage and per-route latency histograms in the Prometheus text format
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(timings.metrics_text(), media_type="text/plain; version=0.0.4")
+
+
+# Filtered rows, `limit` at a time. `cursor` is the dataset position after which to
+# continue; the response's next_cursor is null on the last page. Positions are stable
+# because the dataset is append-only.
+@app.get("/rows")
+async def rows(country: Optional[List[str]] = Query(None), product: Optional[List[str]] = Query(None),
+               year: Optional[List[int]] = Query(None), limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+               cursor: int = Query(-1, ge=-1)):
+    def page():
+        version, df = get_dataset()
+        positions = filter_positions(version, df, country, product, year)
+        start = np.searchsorted(positions, cursor, side="right")
+        selected = positions[start:start + limit]
+        next_cursor = int(selected[-1]) if start + limit < len(positions) else None
+        return {"total": int(len(positions)), "next_cursor": next_cursor,
+                "rows": _jsonable(df.iloc[selected])}
+
+    return _json_response(await run_in_threadpool(page))
+
+
+# All filtered rows streamed as CSV (default) or newline-delimited JSON,
+# serialized STREAM_CHUNK_ROWS at a time
+@app.get("/rows/stream")
+async def rows_stream(country: Optional[List[str]] = Query(None), product: Optional[List[str]] = Query(None),
+                      year: Optional[List[int]] = Query(None), format: str = Query("csv", pattern="^(csv|ndjson)$")):
+    version, df = await run_in_threadpool(get_dataset)
+    positions = await run_in_threadpool(filter_positions, version, df, country, product, year)
+
+    def chunks():
+        for start in range(0, len(positions), STREAM_CHUNK_ROWS):
+            chunk = decode_columns(df.iloc[positions[start:start + STREAM_CHUNK_ROWS]])
+            if format == "csv":
+                yield chunk.to_csv(index=False, header=start == 0)
+            else:
+                yield chunk.to_json(orient="records", lines=True, date_format="iso")
+        if len(positions) == 0 and format == "csv":
+            yield df.iloc[:0].to_csv(index=False)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(chunks(), media_type=media_type)
+
+
+# Filtered rows as a downloadable file in any dashboard export format
+@app.get("/export")
+async def export(country: Optional[List[str]] = Query(None), product: Optional[List[str]] = Query(None),
+                 year: Optional[List[int]] = Query(None), format: str = Query("csv")):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{format}'")
+    version, df = await run_in_threadpool(get_dataset)
+    positions = await run_in_threadpool(filter_positions, version, df, country, product, year)
+    spec = EXPORT_FORMATS[format]
+    return StreamingResponse(iter_export(df.iloc[positions], format), media_type=spec["mime"], headers={
+        "Content-Disposition": f'attachment; filename="Filtered_AI_Data.{spec["extension"]}"'})
+
+
+@app.get("/kpis")
+async def kpis(country: Optional[List[str]] = Query(None), product: Optional[List[str]] = Query(None),
+               year: Optional[List[int]] = Query(None)):
+    result = await run_in_threadpool(get_kpis, country, product, year)
+    return _json_response(_kpi_payload(result))
+
+
+@app.get("/kpis/{tab}")
+async def kpis_tab(tab: str, country: Optional[List[str]] = Query(None), product: Optional[List[str]] = Query(None),
+                   year: Optional[List[int]] = Query(None)):
+    names = {"sales": SALES_FIELDS, "effectiveness": EFFECTIVENESS_FIELDS, "analysis": ANALYSIS_FIELDS}.get(tab)
+    if names is None:
+        raise HTTPException(status_code=404, detail=f"Unknown tab '{tab}'")
+    result = await run_in_threadpool(get_kpis, country, product, year)
+    return _json_response(_kpi_payload(result, names))
+
+
+# A rollup measure per day, month or year (by default completed sales revenue, the
+# Timely Sales Analysis), optionally for the periods overlapping [start, end],
+# downsampled to at most `points` periods
+@app.get("/timeseries/{freq}")
+async def timeseries(freq: str, country: Optional[List[str]] = Query(None), product: Optional[List[str]] = Query(None),
+                     year: Optional[List[int]] = Query(None), points: int = Query(MAX_SERIES_POINTS, ge=3),
+                     start: Optional[date] = Query(None), end: Optional[date] = Query(None),
+                     measure: str = Query("Revenue")):
+    if freq not in ("daily", "monthly", "yearly"):
+        raise HTTPException(status_code=404, detail=f"Unknown frequency '{freq}'")
+    if measure not in ROLLUP_MEASURES:
+        raise HTTPException(status_code=400, detail=f"Unknown measure '{measure}'")
+
+    def series():
+        version, df = get_dataset()
+        rollups = get_rollups(version, df)
+        key = ("timeseries", DATA_STORE, freq, points, start, end, measure,
+               tuple(country or ()), tuple(product or ()), tuple(year or ()))
+
+        def build(previous):
+            totals = rollups.slice(country, product, year).series(freq, list(dict.fromkeys([measure, "Completed"])), start, end)
+            if measure == "Revenue":
+                # Only periods with completed sales, under the column name clients already read
+                totals = totals[totals["Completed"] > 0].rename(columns={"Revenue": "Sales Amount"})
+            value = totals.columns[0]
+            totals = totals.rename_axis("Period")[[value]].reset_index()
+            return downsample(totals, "Period", value, points)
+
+        return _jsonable(shared_cache.get(key, version, build))
+
+    return _json_response(await run_in_threadpool(series))
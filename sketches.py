@@ -0,0 +1,298 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from kpi_cube import FILTER_DIMENSIONS, Synced, _select
+from schema import UUID_DTYPE, concat_frames, empty_frame, uuid_bytes
+
+
+# ----------------- SKETCH PARAMETERS -----------------
+# The approximate analytics mode keeps small mergeable sketches per cube cell
+# (Country x Product Type x Sales year). A sidebar selection is a set of cells, so its
+# sketch is the merge of theirs: the cost depends on the number of cells, not rows.
+#
+# Customers: one sample shared by all cells, of the customers whose hash is below a
+# threshold, with their purchase counts in every cell. The threshold is lowered
+# whenever the sample would exceed SAMPLE_ROWS (cell, customer) entries, so the sample
+# is bounded however many cells there are. A customer is either sampled in every cell
+# or in none, so the sampled customers of any selection are a uniform sample of its
+# customers. Values: log-spaced histograms and exact count/sum/min/max of the
+# QUANTILE_COLUMNS per cell.
+
+# (cell, customer) entries kept in the customer sample. Until the dataset has more,
+# customer figures are exact.
+SAMPLE_ROWS = 2 ** 18
+# Quantiles come from log-spaced buckets and are within this relative error of a true value
+QUANTILE_ACCURACY = 0.01
+QUANTILE_COLUMNS = ["Product Rating", "Refund Amount", "Response Time (days)", "Sales Amount"]
+
+# Worst-case relative error of the approximate quantiles. The error of the customer
+# figures depends on how many customers of a selection are sampled (SketchSlice.errors()).
+ERROR_BOUNDS = {"quantile": QUANTILE_ACCURACY}
+
+_GAMMA = (1 + QUANTILE_ACCURACY) / (1 - QUANTILE_ACCURACY)
+_LOG_GAMMA = np.log(_GAMMA)
+# Values closer to zero than this share the zero bucket; other bucket keys are offset
+# to stay positive (negative values get negative keys)
+_MIN_VALUE = 1e-9
+_BUCKET_OFFSET = int(np.ceil(-np.log(_MIN_VALUE) / _LOG_GAMMA)) + 1
+
+
+# ----------------- HASHING -----------------
+# Function to scramble 64-bit integers (the splitmix64 finalizer)
+def _mix64(x):
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+# Function to hash customer IDs to 64 bits; returns the hashes and a mask of known IDs.
+# Encoded (binary) UUIDs are hashed from their two 64-bit halves.
+def customer_hashes(ids):
+    if ids.dtype == UUID_DTYPE:
+        data, known = uuid_bytes(ids)
+        words = data.view(np.uint64)
+        return _mix64(words[:, 0] ^ _mix64(words[:, 1])), known
+    return pd.util.hash_pandas_object(ids, index=False).to_numpy(), ids.notna().to_numpy()
+
+
+# ----------------- QUANTILE BUCKETS -----------------
+# Function to map values to log-spaced bucket keys: every value in a bucket is within
+# QUANTILE_ACCURACY of the bucket's representative value
+def _buckets(values):
+    magnitude = np.abs(values)
+    keys = np.ceil(np.log(np.maximum(magnitude, _MIN_VALUE)) / _LOG_GAMMA).astype(np.int32) + _BUCKET_OFFSET
+    keys = np.where(magnitude < _MIN_VALUE, 0, keys)
+    return np.where(values < 0, -keys, keys)
+
+
+# Function to get the representative value of bucket keys
+def bucket_values(buckets):
+    buckets = np.asarray(buckets)
+    values = 2 * _GAMMA ** (np.abs(buckets) - _BUCKET_OFFSET) / (_GAMMA + 1)
+    return np.where(buckets == 0, 0.0, np.sign(buckets) * values)
+
+
+# Function to read quantiles `qs` off (bucket, count) pairs, interpolating between the
+# two nearest ranks like pandas' quantile
+def _quantiles(buckets, counts, qs):
+    values = bucket_values(buckets)
+    order = np.argsort(values)
+    values, cumulative = values[order], np.cumsum(np.asarray(counts)[order])
+    if len(values) == 0:
+        return [np.nan] * len(qs)
+    ranks = np.asarray(qs) * (cumulative[-1] - 1)
+    low = values[np.searchsorted(cumulative, np.floor(ranks), side="right")]
+    high = values[np.searchsorted(cumulative, np.ceil(ranks), side="right")]
+    return (low + (high - low) * (ranks - np.floor(ranks))).tolist()
+
+
+# ----------------- BUILDING AND MERGING -----------------
+def _reduce(frame, keys, how):
+    return frame.groupby(keys, observed=True, dropna=False).agg(how).reset_index()
+
+
+# Sketches of every cube cell kept in step with an append-only dataset, like the KPI
+# cube: sync() only sketches the rows added since the last call; a new `generation`
+# (e.g. the loader's full reload counter) or a shorter frame forces a rebuild.
+# merge() adds the sketches of other rows.
+class SketchCube(Synced):
+    def __init__(self):
+        self.cells = None  # one row of filter dimensions per cell; the index is the cell id
+        self.sample = None  # Cell, Hash, Rows, Cancelled; sorted by Hash
+        self.threshold = None  # customers are sampled when their hash is below it; None: all of them
+        self.buckets = None  # Cell, Column, Bucket, Count
+        self.moments = None  # Cell, Column, Rows, Count, Sum, Sum2, Min, Max
+        self.rows_seen = 0
+        self.generation = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df):
+        cube = cls()
+        cube.sync(df)
+        return cube
+
+    def sync(self, df, generation=None):
+        with self._lock:
+            if self.cells is None or generation != self.generation or len(df) < self.rows_seen:
+                self.__init__()
+                self._add(df)
+            elif len(df) > self.rows_seen:
+                self._add(df.iloc[self.rows_seen:])
+            self.rows_seen = len(df)
+            self.generation = generation
+        return self
+
+    # Function to get the cell id of every row, numbering cells not seen before
+    def _cell_ids(self, df):
+        if "Year" in df.columns:
+            years = df["Year"]
+        else:
+            years = pd.to_datetime(df["Sales Date"], errors="coerce").dt.year
+        keys = pd.DataFrame({"Country": df["Country"], "Product Type": df["Product Type"],
+                             "Sales year": years.astype("Int16")})
+        cells = keys.drop_duplicates()
+        if self.cells is not None:
+            known = cells.merge(self.cells.reset_index(names="Cell"), how="left", on=FILTER_DIMENSIONS)
+            cells = cells[known["Cell"].isna().to_numpy()]
+        # New cells are numbered after the known ones
+        self.cells = (concat_frames([self.cells, cells]) if self.cells is not None else cells).reset_index(drop=True)
+        ids = keys.merge(self.cells.reset_index(names="Cell"), how="left", on=FILTER_DIMENSIONS)["Cell"]
+        return ids.to_numpy(dtype=np.int32)
+
+    # Function to add the sketches of new rows
+    def _add(self, df):
+        cell = self._cell_ids(df)
+        hashes, known = customer_hashes(df["Customer ID"])
+        if self.threshold is not None:
+            known &= hashes < self.threshold
+        cancelled = np.asarray(df["Product Status"] == "Cancelled", dtype=bool)
+        rows = pd.DataFrame({"Cell": cell[known], "Hash": hashes[known], "Rows": 1,
+                             "Cancelled": cancelled[known].astype(np.int8)})
+
+        # Value histograms and moments
+        buckets, moments = [], []
+        for i, col in enumerate(QUANTILE_COLUMNS):
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            present = ~np.isnan(values)
+            buckets.append(pd.DataFrame({"Cell": cell[present], "Column": np.int8(i),
+                                         "Bucket": _buckets(values[present]), "Count": 1}))
+            filled = np.where(present, values, 0.0)
+            moments.append(pd.DataFrame({"Cell": cell, "Column": np.int8(i), "Rows": 1, "Count": present.astype(int),
+                                         "Sum": filled, "Sum2": filled * filled, "Min": values, "Max": values}))
+        self._absorb(rows, buckets, moments)
+
+    # Function to add the sketches of another cube (e.g. of another chunk of a store
+    # scanned out of core), as if its rows had been added here
+    def merge(self, other):
+        if other.cells is None:
+            return self
+        with self._lock:
+            ids = self._cell_ids(other.cells.rename(columns={"Sales year": "Year"}))
+            self._absorb(other.sample.assign(Cell=ids[other.sample["Cell"].to_numpy()]),
+                         [other.buckets.assign(Cell=ids[other.buckets["Cell"].to_numpy()])],
+                         [other.moments.assign(Cell=ids[other.moments["Cell"].to_numpy()])],
+                         other.threshold)
+            self.rows_seen += other.rows_seen
+        return self
+
+    # Function to merge sketch entries into this cube: customer `rows` (Cell, Hash, Rows,
+    # Cancelled) sampled below `threshold` (None: all customers), bucket and moment tables
+    def _absorb(self, rows, buckets, moments, threshold=None):
+        # Customer sample: both sides only hold the customers below the lower threshold
+        if threshold is not None and (self.threshold is None or threshold < self.threshold):
+            self.threshold = threshold
+        sample = pd.concat([self.sample, rows], ignore_index=True) if self.sample is not None else rows
+        if self.threshold is not None:
+            sample = sample[(sample["Hash"] < self.threshold).to_numpy()]
+        sample = _reduce(sample, ["Cell", "Hash"], {"Rows": "sum", "Cancelled": "max"})
+        sample = sample.sort_values("Hash", kind="stable").reset_index(drop=True)
+        if len(sample) > SAMPLE_ROWS:
+            # Lower the threshold to the first customer whose entries no longer fit
+            hashes = sample["Hash"].to_numpy()
+            starts = np.flatnonzero(np.r_[True, hashes[1:] != hashes[:-1]])
+            cut = starts[max(np.searchsorted(starts, SAMPLE_ROWS, side="right") - 1, min(1, len(starts) - 1))]
+            self.threshold = hashes[cut]
+            sample = sample.iloc[:cut]
+        self.sample = sample
+
+        self.buckets = _reduce(pd.concat([self.buckets] + buckets, ignore_index=True),
+                               ["Cell", "Column", "Bucket"], {"Count": "sum"})
+        self.moments = _reduce(pd.concat([self.moments] + moments, ignore_index=True), ["Cell", "Column"],
+                               {"Rows": "sum", "Count": "sum", "Sum": "sum", "Sum2": "sum", "Min": "min", "Max": "max"})
+
+    def slice(self, countries=None, products=None, years=None):
+        if self.cells is None:  # nothing synced yet (e.g. an empty store): no customers or values
+            return SketchCube.from_frame(empty_frame()).slice()
+        with self._lock:
+            selected = np.zeros(len(self.cells), dtype=bool)
+            selected[_select(self.cells, countries, products, years).index.to_numpy()] = True
+            sample = self.sample[selected[self.sample["Cell"].to_numpy()]]
+            buckets = self.buckets[selected[self.buckets["Cell"].to_numpy()]]
+            moments = self.moments[selected[self.moments["Cell"].to_numpy()]]
+        return SketchSlice(self.cells, sample, self.threshold, buckets, moments)
+
+
+# The merged sketches of the cells matching one filter state. Figures are estimates
+# (exact where noted).
+class SketchSlice:
+    def __init__(self, cells, sample, threshold, buckets, moments):
+        self.cells = cells
+        self.sample = sample
+        self.threshold = threshold
+        self.buckets = buckets
+        self.moments = moments
+
+    # Share of the customers that are sampled (1: all of them)
+    @property
+    def sampling_rate(self):
+        return 1.0 if self.threshold is None else float(self.threshold) / 2 ** 64
+
+    # Function to estimate (distinct, repeat, churned) customers, as kpis.customer_counts:
+    # the sampled customers' figures scaled up by the sampling rate. Exact while every
+    # customer is sampled.
+    def customers(self):
+        per_customer = self.sample.groupby("Hash").agg({"Rows": "sum", "Cancelled": "max"})
+        counts = len(per_customer), int((per_customer["Rows"] > 1).sum()), int(per_customer["Cancelled"].sum())
+        if self.threshold is None:
+            return counts
+        return tuple(int(round(c / self.sampling_rate)) for c in counts)
+
+    # Function to get one standard error of the customer figures of this selection: the
+    # relative error of the distinct counts and the error of the repeat share (0 when exact)
+    def errors(self):
+        sampled = self.sample["Hash"].nunique()
+        if self.threshold is None:
+            return {"distinct": 0.0, "share": 0.0}
+        if sampled == 0:
+            return {"distinct": np.nan, "share": np.nan}
+        return {"distinct": np.sqrt((1 - self.sampling_rate) / sampled), "share": 0.5 / np.sqrt(sampled)}
+
+    # Function to attach a cell dimension (e.g. Product Type) to the rows of a sketch table
+    def _with(self, table, dim):
+        return table.assign(**{dim: self.cells[dim].take(table["Cell"].to_numpy()).to_numpy()})
+
+    # Function to get box-plot statistics of `column` per `group` (as chart_data.box_stats),
+    # optionally only for `groups`, counting missing values as 0 or leaving out values <= 0
+    def box_stats(self, column, group="Product Type", groups=None, missing_as_zero=False, positive_only=False):
+        i = QUANTILE_COLUMNS.index(column)
+        counts = self._with(self.buckets[self.buckets["Column"] == i], group)
+        if missing_as_zero:
+            moments = self._with(self.moments[self.moments["Column"] == i], group)
+            missing = moments.assign(Count=moments["Rows"] - moments["Count"], Bucket=0)
+            counts = pd.concat([counts, missing[missing["Count"] > 0]], ignore_index=True)
+        counts = counts.groupby([group, "Bucket"], observed=True)["Count"].sum().reset_index()
+        if positive_only:
+            counts = counts[counts["Bucket"] > 0]
+        if groups is not None:
+            counts = counts[counts[group].isin(groups)]
+
+        rows = []
+        for name, part in counts.groupby(group, observed=True):
+            q1, median, q3 = _quantiles(part["Bucket"].to_numpy(), part["Count"].to_numpy(), [0.25, 0.5, 0.75])
+            values = bucket_values(part["Bucket"].to_numpy())
+            inside = values[(values >= q1 - 1.5 * (q3 - q1)) & (values <= q3 + 1.5 * (q3 - q1))]
+            rows.append((name, q1, median, q3, inside.min(), inside.max(), int(part["Count"].sum())))
+        return pd.DataFrame(rows, columns=[group, "q1", "median", "q3", "lowerfence", "upperfence", "count"])
+
+    # Function to estimate DataFrame.describe() of the sketched columns: count, mean,
+    # std, min and max are exact, the quartiles are estimates
+    def describe(self):
+        moments = self.moments.groupby("Column").agg(
+            {"Count": "sum", "Sum": "sum", "Sum2": "sum", "Min": "min", "Max": "max"})
+        buckets = self.buckets.groupby(["Column", "Bucket"])["Count"].sum().reset_index()
+        summary = {}
+        for i, col in enumerate(QUANTILE_COLUMNS):
+            if i not in moments.index:
+                continue
+            m = moments.loc[i]
+            n = m["Count"]
+            part = buckets[buckets["Column"] == i]
+            quartiles = np.clip(_quantiles(part["Bucket"].to_numpy(), part["Count"].to_numpy(), [0.25, 0.5, 0.75]),
+                                m["Min"], m["Max"])
+            mean = m["Sum"] / n if n else np.nan
+            std = np.sqrt(max(m["Sum2"] - n * mean * mean, 0) / (n - 1)) if n > 1 else np.nan
+            summary[col] = [n, mean, std, m["Min"], *quartiles, m["Max"]]
+        return pd.DataFrame(summary, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"])
@@ -0,0 +1,251 @@
+import os
+import glob
+import uuid
+from io import BytesIO
+
+import pandas as pd
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from data_loader import parse_csv_bytes, read_csv
+from filters import filter_mask
+from schema import (CATEGORICAL_COLUMNS, DERIVED_COLUMNS, UUID_COLUMNS, apply_schema, add_date_parts,
+                    decode_columns, empty_frame, encode_uuids)
+
+
+PARTITION_COLUMNS = ["year", "month"]
+# Size of the byte ranges a CSV file is scanned in, and rows per scanned chunk
+CSV_PARTITION_BYTES = 64 * 1024 * 1024
+SCAN_CHUNK_ROWS = 100_000
+
+
+# ----------------- CSV STORE -----------------
+# A single append-only CSV file, the format the dashboard has always used.
+class CSVStore:
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def append(self, df):
+        # Write with header if file doesn't exist, else append without header
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            write_header = f.tell() == 0
+            df.to_csv(f, index=False, header=write_header)
+
+    def read(self, columns=None, years=None):
+        with open(self.path, 'rb') as f:
+            df = parse_csv_bytes(f.read())
+        if years:
+            df = df[df['Year'].isin([int(y) for y in years])]
+        return df[columns] if columns else df
+
+    def years(self):
+        dates = pd.to_datetime(pd.read_csv(self.path, usecols=['Sales Date'], on_bad_lines='skip')['Sales Date'], errors='coerce')
+        return sorted(int(y) for y in dates.dt.year.dropna().unique())
+
+    def header(self):
+        with open(self.path, 'rb') as f:
+            return f.readline()
+
+    # Function to split the rows from byte `start` (0: the first row) up to the last
+    # complete line into (start, end) byte ranges of about `size` bytes
+    def partitions(self, start=0, size=CSV_PARTITION_BYTES):
+        with open(self.path, 'rb') as f:
+            start = max(start, len(f.readline()))
+            end = _last_line_end(f, start, os.fstat(f.fileno()).st_size)
+            bounds = [start]
+            while bounds[-1] < end:
+                f.seek(min(bounds[-1] + size, end) - 1)
+                f.readline()
+                bounds.append(min(f.tell(), end))
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    # Function to read the rows of one byte range as typed chunks of the sidebar
+    # selection. Country and Product Type are checked before the schema is applied,
+    # so rows of other countries and products are never converted.
+    def scan(self, partition, columns=None, countries=None, products=None, years=None, chunk_rows=SCAN_CHUNK_ROWS):
+        start, end = partition
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+            f.seek(start)
+            data = header + f.read(end - start)
+        usecols = None if columns is None else (lambda c: c.strip() in columns)
+        for chunk in read_csv(BytesIO(data), chunksize=chunk_rows, usecols=usecols):
+            chunk.columns = chunk.columns.str.strip()
+            chunk = apply_schema(chunk[filter_mask(chunk, countries, products)])
+            yield chunk[filter_mask(chunk, years=years)] if years else chunk
+
+
+# ----------------- PARQUET STORE -----------------
+# A directory of Parquet files partitioned as year=YYYY/month=M by Sales Date.
+# Columns are written with the schema dtypes, except that categorical columns are
+# written as plain strings (Parquet dictionary-encodes them on disk; pandas
+# categoricals would pin a per-file index width) and come back as categoricals, and
+# UUID columns are written as their text so files stay readable by other tools.
+# The derived Year/Month/Day columns are rebuilt on read, not stored; rows without a
+# Sales Date (migrated legacy data) are partitioned by their Year and get it back on read.
+class ParquetStore:
+    def __init__(self, root):
+        self.root = root
+
+    def exists(self):
+        return bool(self._files())
+
+    def append(self, df):
+        if df.empty:
+            return
+        df = apply_schema(df)
+        # Rows without a parseable Sales Date land in year=<Year or 0>/month=0
+        years = df.pop("Year") if "Year" in df.columns else df["Sales Date"].dt.year
+        df = _to_disk_types(df)
+        df["year"] = years.fillna(0).astype(int)
+        df["month"] = df["Sales Date"].dt.month.fillna(0).astype(int)
+        # Each partition's file is written under a hidden temporary name and renamed
+        # into place, so readers and fingerprints never see a half-written file
+        for (year, month), part in df.groupby(PARTITION_COLUMNS):
+            directory = os.path.join(self.root, f"year={year}", f"month={month}")
+            os.makedirs(directory, exist_ok=True)
+            _write_atomic(part.drop(columns=PARTITION_COLUMNS), os.path.join(directory, f"{uuid.uuid4().hex}.parquet"))
+
+    def read(self, columns=None, years=None, months=None):
+        if not self.exists():
+            return empty_frame(columns)
+        filters = []
+        if years:
+            filters.append(("year", "in", [int(y) for y in years]))
+        if months:
+            filters.append(("month", "in", [int(m) for m in months]))
+        if columns is not None:
+            # Derived columns are rebuilt, Year from the year partition
+            columns = [c for c in columns if c not in DERIVED_COLUMNS] + ["year"]
+        df = pd.read_parquet(self.root, columns=columns, filters=filters or None)
+        if "year" in df.columns:
+            years = df["year"].astype(int)
+            df["Year"] = years.where(years > 0).astype("Int16")
+        df = df.drop(columns=[c for c in PARTITION_COLUMNS if c in df.columns]).reset_index(drop=True)
+        return _from_disk_types(df)
+
+    def years(self):
+        return sorted({int(os.path.basename(p).split("=", 1)[1]) for p in glob.glob(os.path.join(self.root, "year=*"))})
+
+    # Function to list the files of the selected year partitions (all years when none are selected)
+    def partitions(self, years=None):
+        wanted = {int(y) for y in years} if years else None
+        return sorted(f for f in self._files() if wanted is None or _partition_year(f) in wanted)
+
+    # Function to read one file as typed chunks of the sidebar selection. The file is
+    # memory-mapped and the Country / Product Type predicates are pushed down to the
+    # Parquet reader, which skips row groups whose statistics rule them out.
+    def scan(self, partition, columns=None, countries=None, products=None, years=None, chunk_rows=SCAN_CHUNK_ROWS):
+        year = _partition_year(partition)
+        if years and year not in {int(y) for y in years}:
+            return
+        dataset = ds.dataset(partition, format="parquet", filesystem=fs.LocalFileSystem(use_mmap=True))
+        predicate = None
+        for column, values in (("Country", countries), ("Product Type", products)):
+            if values:
+                condition = ds.field(column).isin([str(v) for v in values])
+                predicate = condition if predicate is None else predicate & condition
+        if columns is not None:
+            columns = [c for c in dataset.schema.names if c in columns]
+        for batch in dataset.to_batches(columns=columns, filter=predicate, batch_size=chunk_rows):
+            df = batch.to_pandas()
+            df["Year"] = pd.Series(year if year > 0 else pd.NA, index=df.index, dtype="Int16")
+            yield _from_disk_types(df)
+
+    def compact(self, min_files=2):
+        # Rewrite every month partition holding at least `min_files` small files (one
+        # per append) as a single file; returns the number of partitions rewritten
+        compacted = 0
+        for part in glob.glob(os.path.join(self.root, "year=*", "month=*")):
+            files = sorted(glob.glob(os.path.join(part, "*.parquet")))
+            if len(files) < max(min_files, 2):
+                continue
+            merged = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+            path = os.path.join(part, f"{uuid.uuid4().hex}.parquet")
+            # The merged file is in place before the files it replaces go away, so a crash
+            # never loses rows (at worst they are there twice) and readers always see them
+            _write_atomic(merged, path)
+            for f in files:
+                os.remove(f)
+            compacted += 1
+        return compacted
+
+    def _files(self):
+        return glob.glob(os.path.join(self.root, "year=*", "month=*", "*.parquet"))
+
+
+# Function to get the temporary name a file is written under before it is renamed
+# into place. The leading dot hides it from Parquet dataset discovery and the *.parquet globs.
+def _temporary_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.tmp")
+
+
+# Function to write a Parquet file atomically: readers see all of it or nothing
+def _write_atomic(df, path):
+    tmp = _temporary_path(path)
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+# Function to undo the in-memory encodings and derived columns before writing a Parquet file
+def _to_disk_types(df):
+    df = decode_columns(df.drop(columns=[c for c in DERIVED_COLUMNS if c in df.columns]))
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('string')
+    return df
+
+
+# Function to give columns read from a Parquet file their in-memory types and add the derived date columns
+def _from_disk_types(df):
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in UUID_COLUMNS:
+        if col in df.columns:
+            df[col] = encode_uuids(df[col])
+    if "Sales Date" in df.columns:
+        df = add_date_parts(df)
+    return df
+
+
+# Function to get the year partition (0: no Sales Date) of a Parquet file from its path
+def _partition_year(path):
+    return int(os.path.basename(os.path.dirname(os.path.dirname(path))).split("=", 1)[1])
+
+
+# Function to find the offset just past the last newline between `start` and `end` of
+# an open file (`start` when there is none): a half-written last row is left for later
+def _last_line_end(f, start, end):
+    position = end
+    while position > start:
+        block_start = max(start, position - 65536)
+        f.seek(block_start)
+        newline = f.read(position - block_start).rfind(b'\n')
+        if newline >= 0:
+            return block_start + newline + 1
+        position = block_start
+    return start
+
+
+# Function to pick a store from a path: *.csv files are CSV, anything else is a Parquet directory
+def open_store(path):
+    if path.lower().endswith(".csv"):
+        return CSVStore(path)
+    return ParquetStore(path)
+
+
+# ----------------- IMPORT -----------------
+# Function to load a CSV file into a store, chunk by chunk
+def import_csv(csv_path, store, chunksize=100_000):
+    total = 0
+    for chunk in read_csv(csv_path, chunksize=chunksize):
+        chunk.columns = chunk.columns.str.strip()
+        store.append(chunk)
+        total += len(chunk)
+    return total
+
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root and import each other by name
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_loader import parse_csv_bytes  # noqa: E402
+
+SAMPLE_CSV = os.path.join(ROOT, "AI_Solution_Dataset.csv")
+
+
+@pytest.fixture
+def sample_bytes():
+    with open(SAMPLE_CSV, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def sample_df(sample_bytes):
+    return parse_csv_bytes(sample_bytes)
@@ -0,0 +1,75 @@
+import pytest
+
+from backup import BackupManager, main
+
+
+# The sample file split into its first 50 rows (with the header) and the rest
+@pytest.fixture
+def data(sample_bytes):
+    lines = sample_bytes.splitlines(keepends=True)
+    return lines[:51], lines[51:]
+
+
+def _restored(manager, tmp_path, snapshot):
+    out = tmp_path / f"restored_{snapshot['id']}.csv"
+    manager.restore(str(out), snapshot_id=snapshot["id"])
+    return out.read_bytes()
+
+
+def test_snapshot_restore_round_trip(tmp_path, data):
+    head, tail = data
+    path = tmp_path / "sales.csv"
+    path.write_bytes(b"".join(head))
+    manager = BackupManager(str(tmp_path / "snapshots"))
+
+    first = manager.snapshot(str(path), timestamp=1_000)
+    assert manager.snapshot(str(path), timestamp=1_500) == first  # unchanged file
+    with open(path, "ab") as f:
+        f.write(b"".join(tail))
+    second = manager.snapshot(str(path), timestamp=2_000)
+
+    # The appended rows are stored on their own and the first copy is reused
+    assert second["objects"][:1] == first["objects"] and len(second["objects"]) == 2
+    assert _restored(manager, tmp_path, first) == b"".join(head)
+    assert _restored(manager, tmp_path, second) == b"".join(head + tail)
+    # The manifest is read back by a new manager
+    assert BackupManager(str(tmp_path / "snapshots")).snapshots == manager.snapshots
+
+
+def test_rewritten_file_starts_new_chain(tmp_path, data):
+    head, tail = data
+    path = tmp_path / "sales.csv"
+    path.write_bytes(b"".join(head))
+    manager = BackupManager(str(tmp_path / "snapshots"))
+    manager.snapshot(str(path), timestamp=1_000)
+
+    rewritten = head[:1] + tail
+    path.write_bytes(b"".join(rewritten))
+    snapshot = manager.snapshot(str(path), timestamp=2_000)
+
+    assert len(snapshot["objects"]) == 1
+    assert _restored(manager, tmp_path, snapshot) == b"".join(rewritten)
+
+
+def test_add_copy_chains_onto_earlier_snapshot(tmp_path, data):
+    head, tail = data
+    manager = BackupManager(str(tmp_path / "snapshots"))
+    old = tmp_path / "backup_old.csv"
+    old.write_bytes(b"".join(head))
+    newer = tmp_path / "backup_new.csv"
+    newer.write_bytes(b"".join(head + tail))
+
+    first = manager.add_copy(str(old), 1_000)
+    second = manager.add_copy(str(newer), 2_000)
+
+    assert second["objects"][:1] == first["objects"] and len(second["objects"]) == 2
+    assert _restored(manager, tmp_path, second) == b"".join(head + tail)
+    assert manager.find(at=1_500) == first
+
+
+def test_import_rejects_badly_named_copies(tmp_path, data):
+    copy = tmp_path / "sales_copy.csv"
+    copy.write_bytes(b"".join(data[0]))
+    with pytest.raises(SystemExit):
+        main(["--dir", str(tmp_path / "snapshots"), "import", str(copy)])
+    assert BackupManager(str(tmp_path / "snapshots")).snapshots == []
@@ -0,0 +1,28 @@
+from chart_data import box_stats, effectiveness_charts, refund_boxes
+
+BOX_COLUMNS = ["Product Type", "q1", "median", "q3", "lowerfence", "upperfence", "count"]
+
+
+def test_refund_boxes_of_empty_selection(sample_df):
+    boxes = refund_boxes(sample_df[sample_df["Country"] == "Nowhere"])
+    assert boxes.empty
+    assert list(boxes.columns) == BOX_COLUMNS
+
+
+def test_box_stats_without_values(sample_df):
+    boxes = box_stats(sample_df.assign(**{"Refund Amount": float("nan")}), "Product Type", "Refund Amount")
+    assert boxes.empty
+    assert list(boxes.columns) == BOX_COLUMNS
+
+
+def test_effectiveness_charts_of_empty_selection(sample_df):
+    charts = effectiveness_charts(sample_df.iloc[:0])
+    assert charts["rating_boxes"].empty
+    assert charts["refund_boxes"].empty
+
+
+def test_refund_boxes_count_positive_refunds(sample_df):
+    boxes = refund_boxes(sample_df)
+    refunded = sample_df[sample_df["Refund Amount"] > 0]
+    assert boxes["count"].sum() == len(refunded)
+    assert (boxes["lowerfence"] <= boxes["q1"]).all() and (boxes["q3"] <= boxes["upperfence"]).all()
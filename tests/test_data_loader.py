@@ -0,0 +1,47 @@
+import pandas as pd
+
+from data_loader import IncrementalCSVLoader, parse_csv_bytes
+
+
+def test_appended_rows_match_a_full_read(tmp_path, sample_bytes):
+    header, *rows = sample_bytes.splitlines(keepends=True)
+    path = tmp_path / "sales.csv"
+    path.write_bytes(header + b"".join(rows[:5]))
+    loader = IncrementalCSVLoader(str(path))
+    loader.load()
+
+    for start in range(5, len(rows), 7):
+        with open(path, "ab") as f:
+            f.write(b"".join(rows[start:start + 7]))
+        df = loader.load()
+
+    expected = parse_csv_bytes(sample_bytes)
+    assert loader.full_reloads == 1
+    assert (df.dtypes == expected.dtypes).all()
+    # Categories first seen in later appends are added after the earlier ones
+    pd.testing.assert_frame_equal(df, expected, check_categorical=False)
+
+
+def test_half_written_row_waits_for_its_end(tmp_path, sample_bytes):
+    header, first, second = sample_bytes.splitlines(keepends=True)[:3]
+    path = tmp_path / "sales.csv"
+    path.write_bytes(header + first + second[:10])
+    loader = IncrementalCSVLoader(str(path))
+    assert len(loader.load()) == 1
+
+    with open(path, "ab") as f:
+        f.write(second[10:])
+    assert len(loader.load()) == 2
+    assert loader.full_reloads == 1
+
+
+def test_shrunk_file_is_read_again(tmp_path, sample_bytes):
+    path = tmp_path / "sales.csv"
+    path.write_bytes(sample_bytes)
+    loader = IncrementalCSVLoader(str(path))
+    loader.load()
+
+    header, *rows = sample_bytes.splitlines(keepends=True)
+    path.write_bytes(header + b"".join(rows[:3]))
+    assert len(loader.load()) == 3
+    assert loader.full_reloads == 2
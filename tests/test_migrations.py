@@ -0,0 +1,69 @@
+import csv
+import io
+import os
+
+import pytest
+
+from migrations import LEGACY_V1_COLUMNS, LEGACY_V2_COLUMNS, migrate_files
+from storage import CSVStore, ParquetStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEGACY_BACKUP = os.path.join(ROOT, "backups", "backup_20250410_094627.csv")
+
+
+# Three distinct rows of the oldest legacy backup, as dicts of its fields
+@pytest.fixture
+def legacy_rows():
+    with open(LEGACY_BACKUP, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == LEGACY_V1_COLUMNS
+    return rows[:3]
+
+
+def _write(path, columns, rows):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, columns, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    path.write_text(out.getvalue())
+    return str(path)
+
+
+def test_rows_repeated_across_files_are_written_once(tmp_path, legacy_rows):
+    a, b, c = legacy_rows
+    # v2 files dropped Response Time; the same row in both layouts is a repeat
+    v1 = _write(tmp_path / "v1.csv", LEGACY_V1_COLUMNS, [a, b])
+    v2 = _write(tmp_path / "v2.csv", LEGACY_V2_COLUMNS, [a, b, c])
+    store = ParquetStore(str(tmp_path / "store"))
+
+    report = migrate_files([v1, v2], store)
+
+    assert report == {v1: (1, 2), v2: (2, 1)}
+    assert sorted(store.read()["Customer Name"]) == sorted(r["Customer Name"] for r in legacy_rows)
+
+
+def test_identical_rows_within_a_file_are_kept(tmp_path, legacy_rows):
+    a, b, _ = legacy_rows
+    path = _write(tmp_path / "v1.csv", LEGACY_V1_COLUMNS, [a, a, b, a])
+    store = ParquetStore(str(tmp_path / "store"))
+
+    # One row per chunk: the repeats are in later chunks of the same file
+    assert migrate_files([path], store, chunksize=1) == {path: (1, 4)}
+    assert len(store.read()) == 4
+
+
+def test_without_deduplication_every_row_is_written(tmp_path, legacy_rows):
+    first = _write(tmp_path / "first.csv", LEGACY_V1_COLUMNS, legacy_rows)
+    second = _write(tmp_path / "second.csv", LEGACY_V1_COLUMNS, legacy_rows)
+    store = ParquetStore(str(tmp_path / "store"))
+
+    report = migrate_files([first, second], store, deduplicate=False)
+
+    assert report == {first: (1, 3), second: (1, 3)}
+    assert len(store.read()) == 6
+
+
+def test_legacy_rows_need_a_parquet_store(tmp_path, legacy_rows):
+    path = _write(tmp_path / "v1.csv", LEGACY_V1_COLUMNS, legacy_rows)
+    with pytest.raises(ValueError):
+        migrate_files([path], CSVStore(str(tmp_path / "sales.csv")))
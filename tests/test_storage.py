@@ -0,0 +1,47 @@
+import glob
+import os
+
+import pandas as pd
+
+from storage import ParquetStore
+
+
+def _sorted(df):
+    return df.sort_values(["Customer ID", "Sales Date", "Sales Amount"]).reset_index(drop=True)
+
+
+def _month_partitions(root):
+    return glob.glob(os.path.join(root, "year=*", "month=*"))
+
+
+def test_compact_merges_each_partition_into_one_file(tmp_path, sample_df):
+    store = ParquetStore(str(tmp_path / "store"))
+    for start in range(0, len(sample_df), 25):
+        store.append(sample_df.iloc[start:start + 25])
+    before = store.read()
+    partitions = _month_partitions(store.root)
+    split = [p for p in partitions if len(glob.glob(os.path.join(p, "*.parquet"))) > 1]
+    assert split
+
+    assert store.compact() == len(split)
+    for part in partitions:
+        assert len(glob.glob(os.path.join(part, "*.parquet"))) == 1
+        assert not [f for f in os.listdir(part) if f.endswith(".tmp")]
+    after = store.read()
+    assert len(after) == len(before) == len(sample_df)
+    pd.testing.assert_frame_equal(_sorted(after), _sorted(before))
+
+
+def test_compact_skips_partitions_with_one_file(tmp_path, sample_df):
+    store = ParquetStore(str(tmp_path / "store"))
+    store.append(sample_df)
+    files = sorted(store._files())
+
+    assert store.compact() == 0
+    assert sorted(store._files()) == files
+
+
+def test_read_of_empty_store(tmp_path):
+    df = ParquetStore(str(tmp_path / "missing")).read(["Country", "Sales Amount"])
+    assert df.empty
+    assert list(df.columns) == ["Country", "Sales Amount"]